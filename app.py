@@ -1,9 +1,19 @@
+from startup import STARTUP
+STARTUP.install()  # before the imports below, so the first import of each package is timed
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 from datetime import datetime
 import json
-import time
+import os
+
+from attachments import AttachmentStore, format_size, guess_mime
+from competitor import DEFAULT_KEYWORDS, KeywordMatcher, load_keywords
+from exporter import EXPORT_FORMATS, export_features, missing_package
+from figures import FigureCache
+from importer import IMPORT_COLUMNS, RowValidator, import_features
+from optimizer import DEFAULT_CAPACITY, plan_portfolio
+from shared import ConflictError, DependencyCycleError, SharedPortfolio
+from storage import FeatureStore
 
 # ======================
 # PAGE CONFIGURATION
@@ -18,7 +28,7 @@ st.set_page_config(
 # ======================
 # CUSTOM CSS
 # ======================
-st.markdown("""
+APP_CSS = """
 <style>
     .main-header {
         font-size: 2.8rem;
@@ -131,26 +141,82 @@ st.markdown("""
         background-color: #FECACA;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+@st.cache_resource
+def compact_css():
+    """APP_CSS with indentation and blank lines stripped, built once per process"""
+    return "\n".join(line.strip() for line in APP_CSS.splitlines() if line.strip())
+
+# One element per run: Streamlit drops any element a rerun doesn't send again, so it can't be skipped
+st.markdown(compact_css(), unsafe_allow_html=True)
 
 # ======================
 # CONSTANTS
 # ======================
 BUSINESS_UNITS = ["AI BU", "CX BU", "EX BU", "CE BU", "Platform BU"]
+STATUSES = ["Draft", "Submitted", "Under Review", "Approved", "Rejected"]
+FEATURE_TYPES = ["Hero Big Rock", "Big Rock", "Small Rock"]
+QUARTERS = ["Q1", "Q2", "Q3", "Q4"]
 PM_HEADS = ["AI BU PM Head", "CX BU PM Head", "EX BU PM Head", "CE BU PM Head", "Platform BU PM Head"]
 CURRENT_YEAR = datetime.now().year
+LIST_PAGE_SIZES = [10, 25, 50, 100]
+DEFAULT_LIST_PAGE_SIZE = 25
+BLOCKER_PICKER_RESULTS = 20  # search hits offered when picking the feature a dependency waits on
+DB_PATH = os.environ.get("AOP_DB_PATH", "aop_planner.db")
+SNAPSHOT_PATH = os.environ.get("AOP_SNAPSHOT_PATH", f"{DB_PATH}.snapshot")  # Arrow snapshot dir; empty turns it off
+ATTACHMENTS_PATH = os.environ.get("AOP_ATTACHMENTS_PATH", f"{DB_PATH}.attachments")  # uploaded PRDs and mockups
+ATTACHMENT_PREVIEW_BYTES = 4096  # start of a text PRD shown on the view page
+IMAGE_PREVIEW_MAX_BYTES = 5 * 1024 * 1024  # larger image mockups are download-only
+PRD_STATUS_REFRESH_SECONDS = 2  # how often the view page re-checks background PRD text extraction
+COMPETITOR_KEYWORDS_PATH = os.environ.get("AOP_COMPETITOR_KEYWORDS")  # optional 'term,weight' CSV
+VOTE_REFRESH_SECONDS = float(os.environ.get("AOP_VOTE_REFRESH_SECONDS", "5")) or None  # 0 turns live refresh off
+
+# ======================
+# PERSISTENCE
+# ======================
+@st.cache_resource
+def get_store():
+    """One SQLite store (and connection pool) shared by every session"""
+    with STARTUP.phase("open store"):
+        return FeatureStore(DB_PATH, snapshot_path=SNAPSHOT_PATH)
+
+@st.cache_resource
+def get_attachment_store():
+    """Content-addressed PRD/mockup files on disk, shared by every session"""
+    return AttachmentStore(ATTACHMENTS_PATH)
+
+@st.cache_resource
+def get_competitor_matcher():
+    """Compiled competitor keyword matcher; its per-text score cache is shared too"""
+    keywords = load_keywords(COMPETITOR_KEYWORDS_PATH) if COMPETITOR_KEYWORDS_PATH else DEFAULT_KEYWORDS
+    return KeywordMatcher(keywords)
+
+@st.cache_resource
+def get_portfolio():
+    """Features, their indexes and the vote ledger, shared by every session"""
+    store = get_store()
+    with STARTUP.phase("load portfolio"):
+        return SharedPortfolio(store, attachments=get_attachment_store())
+
+portfolio = get_portfolio()
 
 # ======================
 # SESSION STATE INIT
 # ======================
-if 'features' not in st.session_state:
-    st.session_state.features = []
-if 'votes' not in st.session_state:
-    st.session_state.votes = {}
+# Shared objects: every session sees (and edits) the same portfolio
+for shared_name in ("features", "rice_scorer", "facets", "search_index", "feature_frame",
+                    "dependency_graph", "feature_links", "quarter_scheduler", "votes"):
+    st.session_state[shared_name] = getattr(portfolio, shared_name)
+if 'figure_cache' not in st.session_state:
+    st.session_state.figure_cache = FigureCache()
+if 'aop_plan' not in st.session_state:
+    st.session_state.aop_plan = None  # (features version, capacities, plan)
 if 'step' not in st.session_state:
     st.session_state.step = 1
 if 'edit_feature_id' not in st.session_state:
     st.session_state.edit_feature_id = None
+    st.session_state.edit_base_version = None
 if 'view_feature_id' not in st.session_state:
     st.session_state.view_feature_id = None
 if 'dependency_count' not in st.session_state:
@@ -183,25 +249,24 @@ def get_status_badge(status):
     }
     return status_map.get(status, "⚪")
 
-def save_feature(feature):
-    """Save or update a feature"""
-    if 'id' in feature and feature['id']:
-        # Update existing feature
-        for i, f in enumerate(st.session_state.features):
-            if f['id'] == feature['id']:
-                st.session_state.features[i] = feature
-                return
-    else:
-        # Add new feature
-        feature['id'] = f"F-{len(st.session_state.features)+1:04d}"
+def save_feature(feature, expected_version=None):
+    """Save or update a feature; raises ConflictError if it changed since expected_version"""
+    if not feature.get('id'):
         feature['created_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        st.session_state.features.append(feature)
+    portfolio.save_feature(feature, expected_version=expected_version)
 
 def delete_feature(feature_id):
     """Delete a feature by ID"""
-    st.session_state.features = [f for f in st.session_state.features if f['id'] != feature_id]
-    if feature_id in st.session_state.votes:
-        del st.session_state.votes[feature_id]
+    try:
+        portfolio.delete_feature(feature_id)
+    except ConflictError:
+        pass  # someone else deleted it first
+
+def start_editing(feature):
+    """Open the edit form, remembering the version it was loaded from"""
+    reset_dependency_count()
+    st.session_state.edit_feature_id = feature['id']
+    st.session_state.edit_base_version = feature.get('version')
 
 def get_dependencies_by_team(dependency_details):
     """Organize dependencies by team"""
@@ -213,7 +278,8 @@ def get_dependencies_by_team(dependency_details):
                 team_deps[team] = []
             team_deps[team].append({
                 'title': dep.get('title', ''),
-                'description': dep.get('description', '')
+                'description': dep.get('description', ''),
+                'feature_id': dep.get('feature_id')
             })
     return team_deps
 
@@ -239,16 +305,124 @@ def render_dependencies_html(dependency_details):
                 <div style="margin: 8px 0 8px 10px; padding-left: 10px; border-left: 2px solid #D1D5DB;">
                     <div class="dependency-title">{dep.get('title', 'Untitled Dependency')}</div>
                     <div class="dependency-desc">{dep.get('description', 'No description provided')}</div>
+                    {f'<div class="dependency-desc">⛓️ Blocked by {dep["feature_id"]}</div>' if dep.get('feature_id') else ''}
                 </div>
                 """
         html += "</div>"
     
     return html
 
+def flash(message, icon=None):
+    """Queue a toast for the next render, so handlers can st.rerun() right away"""
+    st.session_state.setdefault('flash_messages', []).append((message, icon))
+
+def show_flash_messages():
+    """Show (and clear) toasts queued before the last rerun"""
+    for message, icon in st.session_state.pop('flash_messages', []):
+        st.toast(message, icon=icon)
+
 def reset_dependency_count():
     """Reset dependency count for new feature"""
     st.session_state.dependency_count = 1
 
+def reset_list_page():
+    """Go back to the first page of the feature list (e.g. when filters change)"""
+    st.session_state.list_page = 0
+
+def format_feature_option(feature_id):
+    """'F-0001 · Title' label for feature pickers"""
+    if not feature_id:
+        return "None"
+    feature = st.session_state.features.get(feature_id)
+    return f"{feature_id} · {feature['title']}" if feature else f"{feature_id} (deleted)"
+
+def find_blockers(query, team, exclude_id=None):
+    """Up to BLOCKER_PICKER_RESULTS of team's feature ids matching query: a typed feature ID first, then search hits"""
+    query = query.strip()
+    if not (team and query):
+        return []
+    team_ids = st.session_state.facets.ids(bu=team)
+    found = [query.upper()] if query.upper() in team_ids else []
+    with portfolio.lock:
+        ranked = st.session_state.search_index.search(query)
+    for feature_id, _ in ranked:
+        if len(found) >= BLOCKER_PICKER_RESULTS:
+            break
+        if feature_id in team_ids and feature_id not in found:
+            found.append(feature_id)
+    return [feature_id for feature_id in found if feature_id != exclude_id]
+
+def store_upload(upload, kind, current):
+    """(file name, digest) of an upload streamed into the attachment store, else the current feature's"""
+    if upload is None:
+        return current.get(f'{kind}_file'), current.get(f'{kind}_sha256')
+    upload.seek(0)
+    digest, _ = get_attachment_store().put(upload)
+    return upload.name, digest
+
+def attachment_download(feature, kind, label):
+    """Download button that reads the stored file only when clicked, plus a preview of small files"""
+    store = get_attachment_store()
+    name, digest = feature.get(f'{kind}_file'), feature.get(f'{kind}_sha256')
+    if not digest or not store.exists(digest):
+        st.caption("File contents were not uploaded")
+        return
+    size = store.size(digest)
+    st.download_button(f"⬇️ {label} ({format_size(size)})", lambda: store.read_range(digest),
+                       file_name=name, mime=guess_mime(name), key=f"download_{kind}_{digest}",
+                       on_click="ignore", use_container_width=True)
+    if name.lower().endswith('.txt'):
+        preview = store.read_range(digest, 0, ATTACHMENT_PREVIEW_BYTES).decode('utf-8', errors='replace')
+        st.text(preview + ("..." if size > ATTACHMENT_PREVIEW_BYTES else ""))
+    elif guess_mime(name).startswith('image/') and size <= IMAGE_PREVIEW_MAX_BYTES:
+        st.image(store.read_range(digest), use_container_width=True)
+
+def prd_index_status(digest):
+    """Whether a PRD's text is searchable yet; only polls while extraction is still running"""
+    if portfolio.prd_extractor is None:
+        return
+    state, passages, error = portfolio.prd_extractor.status(digest)
+    if state == "done":
+        st.caption(f"🔎 PRD text is searchable ({passages} passage{'s' if passages != 1 else ''})")
+    elif state == "failed":
+        st.caption(f"⚠️ PRD text is not searchable: {error}")
+    else:
+        pending_prd_index_status(digest)
+
+@st.fragment(run_every=PRD_STATUS_REFRESH_SECONDS)
+def pending_prd_index_status(digest):
+    """Reruns on its own until extraction settles, then redraws the page once, which drops it and its timer"""
+    state, _, _ = portfolio.prd_extractor.status(digest)
+    if state in ("done", "failed"):
+        st.rerun()
+    st.caption("⏳ Extracting PRD text for search...")
+
+def export_controls(feature_ids, key):
+    """Format picker plus a download of the given features, written to a spooled file in chunks once clicked"""
+    features = st.session_state.features
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        fmt = st.selectbox("Format", list(EXPORT_FORMATS), format_func=str.upper, key=f"{key}_export_format")
+    with col2:
+        st.caption(f"{len(feature_ids):,} features with scores, flattened dependencies and vote tallies")
+    
+    package = missing_package(fmt)
+    if package:
+        st.error(f"⚠️ {fmt.upper()} export needs the {package} package (pip install {package})")
+        return
+    
+    def write_export():
+        # Called by Streamlit when the button is clicked, outside the script run: nothing is written before that.
+        # Streamlit needs the whole file as bytes to serve it, so the full export is in memory while it downloads
+        rows = (feature for feature in map(features.get, feature_ids) if feature)
+        with export_features(rows, portfolio.votes.tallies(), fmt) as export:
+            return export.read()
+    
+    extension, mime = EXPORT_FORMATS[fmt]
+    st.download_button(f"⬇️ Download {extension.upper()}", write_export, mime=mime,
+                       file_name=f"aop_{key}_{datetime.now():%Y%m%d_%H%M}.{extension}", key=f"{key}_download",
+                       on_click="ignore", disabled=not feature_ids, use_container_width=True)
+
 # ======================
 # SIDEBAR NAVIGATION
 # ======================
@@ -289,11 +463,8 @@ with st.sidebar:
     st.subheader("📊 Quick Stats")
     if st.session_state.features:
         total = len(st.session_state.features)
-        by_status = {}
-        by_bu = {}
-        for f in st.session_state.features:
-            by_status[f.get('status', 'Draft')] = by_status.get(f.get('status', 'Draft'), 0) + 1
-            by_bu[f.get('bu', 'Unknown')] = by_bu.get(f.get('bu', 'Unknown'), 0) + 1
+        by_status = st.session_state.facets.counts('status')
+        by_bu = st.session_state.facets.counts('bu')
         
         st.metric("Total Features", total)
         
@@ -307,11 +478,13 @@ with st.sidebar:
     
     st.divider()
     
-    # Demo Data
-    if st.button("🚀 Load Demo Data", use_container_width=True):
+    # Demo Data: added next to whatever is there, never replacing it
+    existing = len(st.session_state.features)
+    confirm_demo = existing == 0 or st.checkbox(f"Add 3 demo features to the {existing:,} existing ones",
+                                                key="confirm_demo")
+    if st.button("🚀 Load Demo Data", use_container_width=True, disabled=not confirm_demo):
         demo_features = [
             {
-                "id": "F-0001",
                 "title": "AI-Powered Customer Segmentation",
                 "description": "Advanced ML model for real-time customer segmentation using behavioral data",
                 "bu": "AI BU",
@@ -352,7 +525,6 @@ with st.sidebar:
                 "status": "Under Review"
             },
             {
-                "id": "F-0002",
                 "title": "Unified Customer Dashboard",
                 "description": "Single pane of glass for customer success metrics across all touchpoints",
                 "bu": "CX BU",
@@ -398,7 +570,6 @@ with st.sidebar:
                 "status": "Submitted"
             },
             {
-                "id": "F-0003",
                 "title": "Employee Engagement Portal",
                 "description": "Central portal for employee feedback, recognition, and engagement tracking",
                 "bu": "EX BU",
@@ -444,11 +615,18 @@ with st.sidebar:
                 "status": "Draft"
             }
         ]
-        st.session_state.features = demo_features
-        st.success("Demo data loaded!")
+        portfolio.add_features(demo_features)
+        flash("Demo data loaded!", "🚀")
         st.rerun()
     
-    if st.button("🔄 Reset All", use_container_width=True):
+    # Reset deletes every PM's features for good, so it has to be typed out
+    with st.expander("⚠️ Reset All"):
+        st.caption("Deletes every feature for all users. This can't be undone.")
+        clear_votes = st.checkbox("Also delete the vote history", key="reset_clear_votes")
+        confirm_reset = st.text_input("Type RESET to confirm", key="reset_confirm") == "RESET"
+        reset = st.button("🔄 Reset All", use_container_width=True, disabled=not confirm_reset)
+    if reset:
+        portfolio.replace_all([], clear_votes=clear_votes)
         for key in list(st.session_state.keys()):
             del st.session_state[key]
         st.session_state.step = "home"
@@ -469,7 +647,8 @@ def home_page():
             st.rerun()
         return
     
-    # Summary Stats
+    # Summary Stats (maintained counters, no scans)
+    facets = st.session_state.facets
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
@@ -477,15 +656,15 @@ def home_page():
         st.metric("Total Features", total)
     
     with col2:
-        pending = len([f for f in st.session_state.features if f.get('status') in ['Draft', 'Submitted', 'Under Review']])
+        pending = sum(facets.count('status', status) for status in ['Draft', 'Submitted', 'Under Review'])
         st.metric("Pending Review", pending)
     
     with col3:
-        approved = len([f for f in st.session_state.features if f.get('status') == 'Approved'])
+        approved = facets.count('status', 'Approved')
         st.metric("Approved", approved)
     
     with col4:
-        hero_rocks = len([f for f in st.session_state.features if 'Hero' in f.get('type', '')])
+        hero_rocks = sum(count for rock_type, count in facets.counts('type').items() if 'Hero' in (rock_type or ''))
         st.metric("Hero Big Rocks", hero_rocks)
     
     st.divider()
@@ -493,12 +672,10 @@ def home_page():
     # Recent Features
     st.subheader("📋 Recent Feature Requests")
     
-    # Sort by creation date (newest first)
-    sorted_features = sorted(st.session_state.features, 
-                           key=lambda x: x.get('created_date', ''), 
-                           reverse=True)
+    # Sort by creation date (newest first); only the 8 shown are read from the registry
+    sorted_features = st.session_state.features.newest(8)
     
-    for feature in sorted_features[:8]:  # Show only 8 most recent
+    for feature in sorted_features:
         with st.container():
             col1, col2 = st.columns([4, 1])
             
@@ -507,7 +684,8 @@ def home_page():
                 status_badge = get_status_badge(feature.get('status', 'Draft'))
                 
                 # Get dependent teams from dependency details
-                dependent_teams = list(set([dep.get('team', '') for dep in feature.get('dependency_details', []) if dep.get('team')]))
+                with portfolio.lock:
+                    dependent_teams = list(st.session_state.dependency_graph.teams_for(feature['id']))
                 
                 # Count total dependencies
                 total_deps = len(feature.get('dependency_details', []))
@@ -551,15 +729,13 @@ def home_page():
                     st.rerun()
                 
                 if st.button("✏️ Edit", key=f"home_edit_{feature['id']}", use_container_width=True):
-                    reset_dependency_count()
-                    st.session_state.edit_feature_id = feature['id']
+                    start_editing(feature)
                     st.session_state.step = 1
                     st.rerun()
                 
                 if st.button("🗑️ Delete", key=f"home_delete_{feature['id']}", use_container_width=True):
                     delete_feature(feature['id'])
-                    st.success(f"Feature {feature['id']} deleted!")
-                    time.sleep(0.5)
+                    flash(f"Feature {feature['id']} deleted!", "🗑️")
                     st.rerun()
     
     # Show all features button if there are more
@@ -572,47 +748,81 @@ def home_page():
     
     # Visualization
     if st.session_state.features:
+        # pandas first: plotly looks it up in sys.modules without importing it, so a half-done import by a
+        # background thread (pyarrow writing the snapshot) would break it; importing waits for that one to finish
+        import pandas  # noqa: F401
+        import plotly.express as px  # deferred; only the charts need it
+        
         st.subheader("📈 Feature Distribution")
         
         tab1, tab2 = st.tabs(["By Business Unit", "By Status"])
         
         with tab1:
-            bu_counts = {}
-            for f in st.session_state.features:
-                bu_counts[f['bu']] = bu_counts.get(f['bu'], 0) + 1
+            bu_counts = facets.counts('bu')
             
             if bu_counts:
-                fig = px.pie(values=list(bu_counts.values()), 
-                           names=list(bu_counts.keys()),
-                           title="Features by Business Unit")
+                fig = st.session_state.figure_cache.get(
+                    ("home_bu_pie", st.session_state.features.version),
+                    lambda: px.pie(values=list(bu_counts.values()), 
+                                   names=list(bu_counts.keys()),
+                                   title="Features by Business Unit"))
                 st.plotly_chart(fig, use_container_width=True)
         
         with tab2:
-            status_counts = {}
-            for f in st.session_state.features:
-                status_counts[f.get('status', 'Draft')] = status_counts.get(f.get('status', 'Draft'), 0) + 1
+            status_counts = facets.counts('status')
             
             if status_counts:
-                fig = px.bar(x=list(status_counts.keys()), 
-                           y=list(status_counts.values()),
-                           title="Features by Status",
-                           labels={'x': 'Status', 'y': 'Count'})
+                fig = st.session_state.figure_cache.get(
+                    ("home_status_bar", st.session_state.features.version),
+                    lambda: px.bar(x=list(status_counts.keys()), 
+                                   y=list(status_counts.values()),
+                                   title="Features by Status",
+                                   labels={'x': 'Status', 'y': 'Count'}))
                 st.plotly_chart(fig, use_container_width=True)
 
 # ======================
 # STEP 1: SUBMIT/EDIT FEATURE
 # ======================
+def bulk_import_section():
+    """Upload many features at once from a CSV, JSONL or Excel file"""
+    with st.expander("📥 Bulk Import (CSV / JSONL / Excel)"):
+        st.caption(f"Columns: {', '.join(IMPORT_COLUMNS)}. Dependencies as 'CX BU: API Integration; Platform BU' "
+                   "or a JSON list of {team, title, description, feature_id}, where feature_id is an existing "
+                   "feature of that team blocking this one. Every row is validated like the form below.")
+        upload = st.file_uploader("Feature file", type=["csv", "jsonl", "json", "xlsx"], key="bulk_import_file")
+        
+        if upload and st.button("📥 Import Features", use_container_width=True):
+            validator = RowValidator(BUSINESS_UNITS, FEATURE_TYPES, STATUSES,
+                                     years=[CURRENT_YEAR + i for i in range(1, 6)],
+                                     features=st.session_state.features)
+            progress = st.empty()
+            try:
+                report = import_features(upload, upload.name, validator, portfolio.add_features,
+                                         progress=lambda rows: progress.caption(f"Processed {rows:,} rows..."))
+            except ImportError:
+                st.error("⚠️ Excel import needs the openpyxl package (pip install openpyxl)")
+                return
+            except ValueError as error:
+                st.error(f"⚠️ {error}")
+                return
+            progress.empty()
+            
+            if report.imported:
+                st.success(f"✅ Imported {report.imported:,} features in {report.elapsed:.1f}s")
+            if report.failed:
+                st.warning(f"⚠️ {report.failed:,} rows were skipped"
+                           + (f" (showing the first {len(report.errors)})" if len(report.errors) < report.failed else ""))
+                import pandas as pd  # deferred; only the error table needs it
+                st.dataframe(pd.DataFrame(report.errors, columns=['Row', 'Problem']),
+                             use_container_width=True, hide_index=True)
+
 def step1_submit():
     # Determine if editing or creating
     is_editing = st.session_state.edit_feature_id is not None
     
     if is_editing:
         # Find the feature being edited
-        feature_to_edit = None
-        for f in st.session_state.features:
-            if f['id'] == st.session_state.edit_feature_id:
-                feature_to_edit = f
-                break
+        feature_to_edit = st.session_state.features.get(st.session_state.edit_feature_id)
         
         if not feature_to_edit:
             st.error("Feature not found!")
@@ -633,6 +843,9 @@ def step1_submit():
     
     st.markdown(f'<h1 class="main-header">{title}</h1>', unsafe_allow_html=True)
     
+    if not is_editing:
+        bulk_import_section()
+    
     with st.container():
         st.markdown('<div class="step-card">', unsafe_allow_html=True)
         
@@ -756,6 +969,26 @@ def step1_submit():
                         key=f"dep_team_{i}"
                     )
                     
+                    # Optional: the feature of that team this one is blocked by, found by search (a BU can have thousands)
+                    blocker_query = st.text_input(
+                        f"Find Blocking Feature {i+1} (optional)",
+                        placeholder="Feature ID or words from its title or description",
+                        key=f"dep_feature_query_{i}",
+                        disabled=not dep_team
+                    )
+                    blocker_options = [""] + find_blockers(blocker_query, dep_team,
+                                                           feature_to_edit['id'] if is_editing else None)
+                    if current_dep.get('feature_id') and current_dep['feature_id'] not in blocker_options:
+                        blocker_options.append(current_dep['feature_id'])
+                    dep_feature = st.selectbox(
+                        f"Blocked by Feature {i+1} (optional)",
+                        blocker_options,
+                        index=blocker_options.index(current_dep['feature_id']) if current_dep.get('feature_id') else 0,
+                        format_func=format_feature_option,
+                        key=f"dep_feature_{i}",
+                        help="Search above, then pick the feature that has to ship before this one can"
+                    )
+                    
                     # Dependency title and description
                     dep_title = st.text_input(
                         f"Dependency Title {i+1}",
@@ -785,11 +1018,14 @@ def step1_submit():
                     
                     # Only add if team is selected
                     if dep_team:
-                        new_dependency_details.append({
+                        dependency = {
                             "team": dep_team,
                             "title": dep_title,
                             "description": dep_desc
-                        })
+                        }
+                        if dep_feature:
+                            dependency["feature_id"] = dep_feature
+                        new_dependency_details.append(dependency)
                     elif dep_title or dep_desc:
                         # If user entered title/description but no team, warn them
                         st.warning(f"Please select a team for dependency {i+1} or clear the fields.")
@@ -846,8 +1082,8 @@ def step1_submit():
         if is_editing:
             status = st.selectbox(
                 "Status",
-                ["Draft", "Submitted", "Under Review", "Approved", "Rejected"],
-                index=["Draft", "Submitted", "Under Review", "Approved", "Rejected"].index(
+                STATUSES,
+                index=STATUSES.index(
                     feature_to_edit.get('status', 'Draft')
                 )
             )
@@ -863,6 +1099,11 @@ def step1_submit():
                     # Extract dependent teams from dependency details
                     dependent_teams = list(set([dep['team'] for dep in new_dependency_details if dep.get('team')]))
                     
+                    # Stream new uploads to disk (deduplicated by content); keep the current files otherwise
+                    current_files = feature_to_edit if is_editing else {}
+                    prd_name, prd_digest = store_upload(prd_file, 'prd', current_files)
+                    mockup_name, mockup_digest = store_upload(mockup_file, 'mockup', current_files)
+                    
                     feature_data = {
                         "id": feature_to_edit['id'] if is_editing else None,
                         "title": feature_title,
@@ -876,8 +1117,10 @@ def step1_submit():
                         "effort": effort,
                         "dependency_details": new_dependency_details,
                         "dependent_teams": dependent_teams,  # Derived from dependency details
-                        "prd_file": prd_file.name if prd_file else feature_to_edit.get('prd_file') if is_editing else None,
-                        "mockup_file": mockup_file.name if mockup_file else feature_to_edit.get('mockup_file') if is_editing else None,
+                        "prd_file": prd_name,
+                        "prd_sha256": prd_digest,
+                        "mockup_file": mockup_name,
+                        "mockup_sha256": mockup_digest,
                         "submitted_by": feature_to_edit.get('submitted_by', 'User') if is_editing else "Current User",
                         "status": status,
                         "rice_score": feature_to_edit.get('rice_score', 0) if is_editing else 0,
@@ -885,20 +1128,26 @@ def step1_submit():
                         "created_date": feature_to_edit.get('created_date') if is_editing else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                     }
                     
-                    save_feature(feature_data)
-                    
-                    if is_editing:
-                        st.success(f"✅ Feature {feature_to_edit['id']} updated successfully!")
+                    try:
+                        save_feature(feature_data, st.session_state.edit_base_version if is_editing else None)
+                    except DependencyCycleError as error:
+                        st.error(f"⚠️ {error}")
+                    except ConflictError as error:
+                        st.error(f"⚠️ {error}. Your changes were not saved; go back and reopen the feature to see theirs.")
                     else:
-                        st.success("✅ Feature request submitted successfully!")
-                    
-                    # Clear edit state and reset dependency count
-                    st.session_state.edit_feature_id = None
-                    reset_dependency_count()
-                    
-                    time.sleep(1)
-                    st.session_state.step = "home"
-                    st.rerun()
+                        if is_editing:
+                            flash(f"Feature {feature_to_edit['id']} updated successfully!", "✅")
+                        else:
+                            flash(f"Feature request {feature_data['id']} submitted successfully!", "✅")
+                        if prd_file:
+                            flash("PRD text is being extracted in the background; it becomes searchable shortly", "📄")
+                        
+                        # Clear edit state and reset dependency count
+                        st.session_state.edit_feature_id = None
+                        reset_dependency_count()
+                        
+                        st.session_state.step = "home"
+                        st.rerun()
                 else:
                     st.error("⚠️ Please fill in all required fields (Title and Description)")
         
@@ -932,40 +1181,85 @@ def list_features_page():
             st.rerun()
         return
     
-    # Filters (same as before)
+    # Full-text search over titles, descriptions and dependency details
+    search_query = st.text_input("🔎 Search features", key="list_search", on_change=reset_list_page,
+                                 placeholder="Search titles, descriptions, dependencies and PRDs (prefixes work too)")
+    if portfolio.prd_extractor is not None:
+        prds_done, prds_seen = portfolio.prd_extractor.progress()
+        if prds_done < prds_seen:
+            st.caption(f"⏳ Reading PRDs in the background: {prds_done:,} of {prds_seen:,} done; "
+                       "matches inside the rest will show up once they are")
+    
+    # Filters, answered from the facet indexes; dropdowns show counts given the other filters
+    facets = st.session_state.facets
+    active = {field: st.session_state.get(f"filter_{field}", "All") for field in ("bu", "status", "year", "type")}
+    active = {field: value for field, value in active.items() if value != "All"}
+    
+    def facet_label(field):
+        counts = facets.counts(field, **active)
+        return lambda value: value if value == "All" else f"{value} ({counts.get(value, 0)})"
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        filter_bu = st.selectbox("Filter by BU", ["All"] + BUSINESS_UNITS)
+        filter_bu = st.selectbox("Filter by BU", ["All"] + BUSINESS_UNITS, key="filter_bu",
+                                 format_func=facet_label("bu"), on_change=reset_list_page)
     
     with col2:
-        filter_status = st.selectbox("Filter by Status", ["All", "Draft", "Submitted", "Under Review", "Approved", "Rejected"])
+        filter_status = st.selectbox("Filter by Status", ["All"] + STATUSES, key="filter_status",
+                                     format_func=facet_label("status"), on_change=reset_list_page)
     
     with col3:
-        filter_year = st.selectbox("Filter by Year", ["All"] + list(sorted(set([f['year'] for f in st.session_state.features]))))
+        filter_year = st.selectbox("Filter by Year", ["All"] + facets.values("year"), key="filter_year",
+                                   format_func=facet_label("year"), on_change=reset_list_page)
     
     with col4:
-        filter_type = st.selectbox("Filter by Type", ["All", "Hero Big Rock", "Big Rock", "Small Rock"])
-    
-    # Apply filters (same as before)
-    filtered_features = st.session_state.features.copy()
-    
-    if filter_bu != "All":
-        filtered_features = [f for f in filtered_features if f['bu'] == filter_bu]
-    
-    if filter_status != "All":
-        filtered_features = [f for f in filtered_features if f.get('status') == filter_status]
-    
-    if filter_year != "All":
-        filtered_features = [f for f in filtered_features if f['year'] == filter_year]
-    
-    if filter_type != "All":
-        filtered_features = [f for f in filtered_features if f['type'] == filter_type]
+        filter_type = st.selectbox("Filter by Type", ["All"] + FEATURE_TYPES, key="filter_type",
+                                   format_func=facet_label("type"), on_change=reset_list_page)
+    
+    # Apply filters
+    criteria = {field: value for field, value in
+                (("bu", filter_bu), ("status", filter_status), ("year", filter_year), ("type", filter_type))
+                if value != "All"}
+    filtered_ids = facets.filter(**criteria)
+    
+    if search_query.strip():
+        # Search results are ranked by relevance; filters narrow them down
+        with portfolio.lock:
+            ranked_ids = [feature_id for feature_id, _ in st.session_state.search_index.search(search_query)]
+        if filtered_ids is not None:
+            allowed = set(filtered_ids)
+            ranked_ids = [feature_id for feature_id in ranked_ids if feature_id in allowed]
+        filtered_ids = ranked_ids
+    
+    if filtered_ids is None:
+        filtered_ids = st.session_state.features.ids()
+    
+    # Pagination: only the current page is rendered
+    col_count, col_size = st.columns([3, 1])
+    
+    with col_size:
+        page_size = st.selectbox("Features per page", LIST_PAGE_SIZES,
+                                 index=LIST_PAGE_SIZES.index(DEFAULT_LIST_PAGE_SIZE),
+                                 on_change=reset_list_page)
+    
+    page_count = max(1, -(-len(filtered_ids) // page_size))
+    page = min(st.session_state.get('list_page', 0), page_count - 1)
+    start = page * page_size
+    # Only this page's features are read (from a snapshot, only these rows are materialized)
+    page_features = [feature for feature in map(st.session_state.features.get, filtered_ids[start:start + page_size])
+                     if feature]
     
     # Display features
-    st.write(f"**Showing {len(filtered_features)} of {len(st.session_state.features)} features**")
+    with col_count:
+        first = start + 1 if page_features else 0
+        st.write(f"**Showing {first}-{start + len(page_features)} of {len(filtered_ids)} matching features "
+                 f"({len(st.session_state.features)} total)**")
     
-    for feature in filtered_features:
+    with st.expander("📤 Export matching features"):
+        export_controls(filtered_ids, "features")
+    
+    for feature in page_features:
         # Create a container for each feature
         with st.container():
             st.markdown(f"""
@@ -1001,7 +1295,8 @@ def list_features_page():
                 
                 with col1:
                     # Get dependent teams
-                    dependent_teams = list(set([dep.get('team', '') for dep in feature.get('dependency_details', []) if dep.get('team')]))
+                    with portfolio.lock:
+                        dependent_teams = list(st.session_state.dependency_graph.teams_for(feature['id']))
                     total_deps = len(feature.get('dependency_details', []))
                     
                     st.write(f"**Dependent Teams:** {', '.join(dependent_teams) if dependent_teams else 'None'} ({total_deps} dependency{'s' if total_deps != 1 else ''})")
@@ -1011,13 +1306,7 @@ def list_features_page():
                         st.write("**Dependent Functionality/Needs:**")
                         
                         # Group by team
-                        team_deps = {}
-                        for dep in feature.get('dependency_details', []):
-                            team = dep.get('team', '')
-                            if team:
-                                if team not in team_deps:
-                                    team_deps[team] = []
-                                team_deps[team].append(dep)
+                        team_deps = get_dependencies_by_team(feature.get('dependency_details', []))
                         
                         for team, deps in team_deps.items():
                             badge_class = get_bu_badge(team)
@@ -1033,6 +1322,8 @@ def list_features_page():
                                     <div style="color: #6B7280; font-size: 0.9rem;">{description}</div>
                                 </div>
                                 """, unsafe_allow_html=True)
+                                if dep.get('feature_id'):
+                                    st.caption(f"⛓️ Blocked by {format_feature_option(dep['feature_id'])}")
                     
                     st.caption(f"Created: {feature.get('created_date', 'Unknown')}")
                 
@@ -1044,19 +1335,35 @@ def list_features_page():
                         st.rerun()
                     
                     if st.button("✏️ Edit", key=f"list_edit_{feature['id']}", use_container_width=True):
-                        reset_dependency_count()
-                        st.session_state.edit_feature_id = feature['id']
+                        start_editing(feature)
                         st.session_state.step = 1
                         st.rerun()
                     
                     if st.button("🗑️ Delete", key=f"list_delete_{feature['id']}", use_container_width=True):
                         delete_feature(feature['id'])
-                        st.success(f"Feature {feature['id']} deleted!")
-                        time.sleep(0.5)
+                        flash(f"Feature {feature['id']} deleted!", "🗑️")
                         st.rerun()
             
             st.markdown("</div>", unsafe_allow_html=True)
     
+    # Page navigation
+    if page_count > 1:
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        
+        with col_prev:
+            if st.button("← Previous", disabled=page == 0, use_container_width=True):
+                st.session_state.list_page = page - 1
+                st.rerun()
+        
+        with col_page:
+            st.markdown(f"<p style='text-align: center; color: #6B7280;'>Page {page + 1} of {page_count}</p>",
+                        unsafe_allow_html=True)
+        
+        with col_next:
+            if st.button("Next →", disabled=page >= page_count - 1, use_container_width=True):
+                st.session_state.list_page = page + 1
+                st.rerun()
+    
     # Back button
     if st.button("← Back to Home", use_container_width=True):
         st.session_state.step = "home"
@@ -1071,11 +1378,7 @@ def view_feature_page():
         st.rerun()
     
     # Find the feature
-    feature_to_view = None
-    for f in st.session_state.features:
-        if f['id'] == st.session_state.view_feature_id:
-            feature_to_view = f
-            break
+    feature_to_view = st.session_state.features.get(st.session_state.view_feature_id)
     
     if not feature_to_view:
         st.error("Feature not found!")
@@ -1103,8 +1406,7 @@ def view_feature_page():
         
         with col2:
             if st.button("✏️ Edit this Feature", use_container_width=True):
-                reset_dependency_count()
-                st.session_state.edit_feature_id = feature_to_view['id']
+                start_editing(feature_to_view)
                 st.session_state.view_feature_id = None
                 st.session_state.step = 1
                 st.rerun()
@@ -1137,7 +1439,8 @@ def view_feature_page():
         st.subheader("🔗 Dependent Functionality/Needs by Team")
         
         # Get dependent teams from dependency details
-        dependent_teams = list(set([dep.get('team', '') for dep in feature_to_view.get('dependency_details', []) if dep.get('team')]))
+        with portfolio.lock:
+            dependent_teams = list(st.session_state.dependency_graph.teams_for(feature_to_view['id']))
         total_deps = len(feature_to_view.get('dependency_details', []))
         
         if dependent_teams:
@@ -1146,13 +1449,7 @@ def view_feature_page():
             # Display dependencies without using render_dependencies_html()
             if feature_to_view.get('dependency_details'):
                 # Group by team
-                team_deps = {}
-                for dep in feature_to_view.get('dependency_details', []):
-                    team = dep.get('team', '')
-                    if team:
-                        if team not in team_deps:
-                            team_deps[team] = []
-                        team_deps[team].append(dep)
+                team_deps = get_dependencies_by_team(feature_to_view.get('dependency_details', []))
                 
                 # Display each team's dependencies
                 for team, deps in team_deps.items():
@@ -1169,9 +1466,39 @@ def view_feature_page():
                             <div style="color: #6B7280; font-size: 0.95rem; margin-top: 4px;">{description}</div>
                         </div>
                         ''', unsafe_allow_html=True)
+                        if dep.get('feature_id'):
+                            st.caption(f"⛓️ Blocked by {format_feature_option(dep['feature_id'])}")
         else:
             st.info("No dependencies specified for this feature")
         
+        # Feature-to-feature links
+        links = st.session_state.feature_links
+        blocked_by = links.blockers(feature_to_view['id'])
+        blocks = links.blocked(feature_to_view['id'])
+        if blocked_by or blocks:
+            st.subheader("⛓️ Delivery Order")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.write("**Blocked by:**")
+                for feature_id in blocked_by:
+                    st.write(f"• {format_feature_option(feature_id)}")
+                if not blocked_by:
+                    st.caption("Nothing")
+            with col2:
+                st.write("**Blocks:**")
+                for feature_id in blocks:
+                    st.write(f"• {format_feature_option(feature_id)}")
+                if not blocks:
+                    st.caption("Nothing")
+            with col3:
+                with portfolio.lock:
+                    chain, effort_points = links.critical_path(feature_to_view['id'])
+                    in_cycle = feature_to_view['id'] in links.cyclic_features()
+                if in_cycle:
+                    st.warning("⚠️ Part of a dependency cycle")
+                else:
+                    st.metric("Critical Path", f"{chain} features", f"{effort_points} effort points", delta_color="off")
+        
         # Attachments
         st.subheader("📎 Attachments")
         col1, col2 = st.columns(2)
@@ -1179,12 +1506,16 @@ def view_feature_page():
         with col1:
             if feature_to_view.get('prd_file'):
                 st.success(f"✅ PRD: {feature_to_view['prd_file']}")
+                attachment_download(feature_to_view, 'prd', "Download PRD")
+                if feature_to_view.get('prd_sha256'):
+                    prd_index_status(feature_to_view['prd_sha256'])
             else:
                 st.warning("⚠️ No PRD uploaded")
         
         with col2:
             if feature_to_view.get('mockup_file'):
                 st.success(f"✅ Mockups: {feature_to_view['mockup_file']}")
+                attachment_download(feature_to_view, 'mockup', "Download Mockup")
             else:
                 st.info("ℹ️ No mockups uploaded")
         
@@ -1208,8 +1539,7 @@ def view_feature_page():
             if st.button("🗑️ Delete this Feature", use_container_width=True):
                 delete_feature(feature_to_view['id'])
                 st.session_state.view_feature_id = None
-                st.success(f"Feature {feature_to_view['id']} deleted!")
-                time.sleep(0.5)
+                flash(f"Feature {feature_to_view['id']} deleted!", "🗑️")
                 st.session_state.step = "home"
                 st.rerun()
         
@@ -1219,6 +1549,9 @@ def view_feature_page():
 # STEP 2: ANALYZE & SCORE
 # ======================
 def step2_analyze():
+    import pandas as pd  # deferred; only the analysis pages need pandas and plotly
+    import plotly.express as px
+    
     st.markdown('<h1 class="main-header">🔍 Analyze & Prioritize</h1>', unsafe_allow_html=True)
     
     if not st.session_state.features:
@@ -1241,23 +1574,14 @@ def step2_analyze():
         if not features_to_analyze:
             st.info("All features have been analyzed. Add new features or update existing ones.")
         
-        features_df = pd.DataFrame(st.session_state.features)
+        # Shared columnar view; dependency columns are precomputed per row
+        with portfolio.lock:
+            features_df = st.session_state.feature_frame.frame()
         
         # Display in a nice table with dependency info
         if not features_df.empty:
-            # Create a column for dependent teams summary
-            def get_dependent_teams_summary(deps):
-                teams = list(set([dep.get('team', '') for dep in deps if dep.get('team')]))
-                return ', '.join(teams) if teams else 'None'
-            
-            def get_dependency_count(deps):
-                return len(deps)
-            
-            features_df['dependent_teams'] = features_df['dependency_details'].apply(get_dependent_teams_summary)
-            features_df['dependency_count'] = features_df['dependency_details'].apply(get_dependency_count)
-            
-            display_cols = ["id", "title", "bu", "type", "impact", "effort", "status", "rice_score", "dependent_teams", "dependency_count"]
-            st.dataframe(features_df[display_cols], use_container_width=True)
+            display_cols = ["title", "bu", "type", "impact", "effort", "status", "rice_score", "dependent_teams", "dependency_count"]
+            st.dataframe(features_df[display_cols].reset_index(), use_container_width=True)
         
         # Competitor Analysis Section
         st.subheader("🎯 Competitor Analysis")
@@ -1274,13 +1598,14 @@ def step2_analyze():
         
         if st.button("🔍 Run Competitor Analysis", use_container_width=True):
             with st.spinner("Analyzing competitors..."):
-                time.sleep(2)
-                # Mock competitor analysis
+                # Mock competitor analysis: keyword matching, cached per title/description
+                matcher = get_competitor_matcher()
+                updates = {}
                 for feature in st.session_state.features:
-                    # Simple mock scoring based on keywords
-                    keywords = ["AI", "analytics", "mobile", "redesign", "automation", "customer", "dashboard"]
-                    score = sum(1 for kw in keywords if kw.lower() in feature['title'].lower() or kw.lower() in feature['description'].lower())
-                    feature['competitor_score'] = min(score * 2, 10)
+                    score = matcher.score_feature(feature)
+                    if feature.get('competitor_score') != score:
+                        updates[feature['id']] = {'competitor_score': score}
+                portfolio.patch_features(updates)
                 st.success("✅ Competitor analysis completed!")
         
         # RICE Scoring Section
@@ -1302,37 +1627,25 @@ def step2_analyze():
         
         if st.button("🧮 Calculate RICE Scores", type="primary", use_container_width=True):
             with st.spinner("Calculating RICE scores..."):
-                time.sleep(1)
-                for feature in st.session_state.features:
-                    # Mock RICE calculation
-                    reach = feature.get('impact', 5) * 1000
-                    impact = feature.get('impact', 5) / 2.5
-                    confidence = 0.8
-                    effort_map = {"XS": 1, "S": 2, "M": 3, "L": 5, "XL": 8}
-                    effort = effort_map.get(feature.get('effort', 'M'), 3)
-                    
-                    rice_score = (reach * reach_weight + 
-                                 impact * impact_weight * 100 + 
-                                 confidence * confidence_weight * 100) / (effort * effort_weight)
-                    
-                    feature['rice_score'] = round(rice_score, 2)
-                
+                # Mock RICE calculation, vectorized over all features
+                with portfolio.lock:
+                    scores = st.session_state.rice_scorer.score_map(
+                        reach_weight, impact_weight, confidence_weight, effort_weight
+                    )
+                    updates = {feature['id']: {'rice_score': scores[feature['id']]}
+                               for feature in st.session_state.features
+                               if feature.get('rice_score') != scores[feature['id']]}
+                portfolio.patch_features(updates)
                 st.success("✅ RICE scoring completed!")
         
         # Show Results
-        if any(f.get('rice_score', 0) > 0 for f in st.session_state.features):
+        with portfolio.lock:
+            features_df = st.session_state.feature_frame.frame()
+        if (features_df['rice_score'] > 0).any():
             st.subheader("📈 Prioritization Results")
             
             # Create results dataframe
-            results_df = pd.DataFrame(st.session_state.features)
-            results_df = results_df.sort_values('rice_score', ascending=False)
-            
-            # Add dependent teams column
-            results_df['dependent_teams'] = results_df['dependency_details'].apply(
-                lambda deps: ', '.join(list(set([dep.get('team', '') for dep in deps if dep.get('team')]))) or 'None'
-            )
-            
-            results_df['dependency_count'] = results_df['dependency_details'].apply(len)
+            results_df = features_df.sort_values('rice_score', ascending=False).reset_index()
             
             # Display with colors
             st.dataframe(
@@ -1343,12 +1656,197 @@ def step2_analyze():
             )
             
             # Visualization
-            fig = px.bar(results_df.head(10), 
-                        x='title', y='rice_score',
-                        color='bu',
-                        title="Top 10 Features by RICE Score")
+            fig = st.session_state.figure_cache.get(
+                ("rice_top10", st.session_state.features.version),
+                lambda: px.bar(results_df.head(10), 
+                               x='title', y='rice_score',
+                               color='bu',
+                               title="Top 10 Features by RICE Score"))
             st.plotly_chart(fig, use_container_width=True)
         
+        # Capacity-constrained plan: best RICE per BU and quarter within its effort budget
+        st.subheader("📦 Proposed AOP Plan")
+        st.caption("Effort points each BU can deliver per quarter (XS=1, S=2, M=3, L=5, XL=8)")
+        capacity_cols = st.columns(len(BUSINESS_UNITS))
+        capacities = {}
+        for col, bu in zip(capacity_cols, BUSINESS_UNITS):
+            with col:
+                capacities[bu] = st.number_input(bu, min_value=0, max_value=10000, value=DEFAULT_CAPACITY,
+                                                 step=1, key=f"capacity_{bu}")
+        
+        plan_key = (st.session_state.features.version, tuple(sorted(capacities.items())))
+        if not st.session_state.aop_plan or st.session_state.aop_plan[:2] != plan_key:
+            st.session_state.aop_plan = plan_key + (plan_portfolio(st.session_state.features, capacities),)
+        plan = st.session_state.aop_plan[2]
+        
+        if not any(selection.candidates for selection in plan.values()):
+            st.info("Calculate RICE scores first; the plan picks the highest-scoring features that fit.")
+        else:
+            summary = []
+            for (bu, year, quarter), selection in plan.items():
+                summary.append({
+                    'BU': bu,
+                    'Quarter': f"{quarter} {year}",
+                    'Selected': f"{len(selection.selected)} / {selection.candidates}",
+                    'Effort Used': f"{selection.effort} / {selection.capacity}",
+                    'Total RICE': selection.value,
+                    'Method': selection.method if selection.method == "optimal"
+                    else f"greedy (within {selection.gap:.1%})"
+                })
+            st.dataframe(pd.DataFrame(summary), use_container_width=True, hide_index=True)
+            
+            selected_ids = [feature_id for selection in plan.values() for feature_id in selection.selected]
+            with st.expander(f"✅ Selected features ({len(selected_ids)})"):
+                if selected_ids:
+                    st.dataframe(features_df.loc[selected_ids, ['title', 'bu', 'quarter', 'year', 'effort', 'rice_score']].reset_index(),
+                                 use_container_width=True, hide_index=True)
+                else:
+                    st.caption("Nothing fits in the given capacity")
+        
+        # Export: the whole portfolio by priority, or just what the plan picked
+        with st.expander("📤 Export prioritized features"):
+            scope = st.radio("Scope", ["All features", "Proposed AOP plan"], horizontal=True, key="analyze_export_scope")
+            if scope == "All features":
+                export_ids = features_df['rice_score'].sort_values(ascending=False, kind='stable').index.tolist()
+            else:
+                export_ids = [feature_id for selection in plan.values() for feature_id in selection.selected]
+            export_controls(export_ids, "prioritized")
+        
+        # Quarter schedule: same team capacities, now shared between own work and dependency asks
+        st.subheader("🗓️ Proposed Quarter Schedule")
+        st.caption("Each feature needs its effort from the owning BU and from every team it depends on, "
+                   "in the same quarter, and lands after the features blocking it.")
+        scheduler = st.session_state.quarter_scheduler
+        # Capacities are this session's own; the shared scheduler keeps a plan per capacity setting
+        with portfolio.lock:
+            moves = scheduler.moves(capacities)
+            slots = scheduler.slots(capacities)
+            plan_version = scheduler.plan_version(capacities)
+            utilization = [[round(100 * scheduler.load(team, year, quarter, capacities)
+                                  / max(scheduler.team_capacity(team, capacities), 1))
+                            for year, quarter in slots] for team in BUSINESS_UNITS]
+        if slots:
+            slot_labels = [f"{quarter} {year}" for year, quarter in slots]
+            fig = st.session_state.figure_cache.get(
+                ("schedule_load", plan_version, tuple(sorted(capacities.items()))),
+                lambda: px.imshow(utilization, x=slot_labels, y=BUSINESS_UNITS,
+                                  labels={'x': 'Quarter', 'y': 'Team', 'color': '% of capacity'},
+                                  text_auto=True, color_continuous_scale='RdYlGn_r', zmin=0, zmax=100,
+                                  title="Team load under the proposed schedule (% of quarterly capacity)"))
+            st.plotly_chart(fig, use_container_width=True)
+        
+        if moves:
+            move_rows = []
+            for feature_id, (year, quarter), proposed in moves:
+                feature = st.session_state.features.get(feature_id)
+                if not feature:
+                    continue  # deleted meanwhile
+                move_rows.append({
+                    'ID': feature_id,
+                    'Title': feature['title'],
+                    'BU': feature['bu'],
+                    'Entered': f"{quarter} {year}",
+                    'Proposed': f"{proposed[1]} {proposed[0]}" if proposed else "⚠️ Does not fit"
+                })
+            st.dataframe(pd.DataFrame(move_rows), use_container_width=True, hide_index=True)
+            
+            movable = [(feature_id, proposed) for feature_id, _, proposed in moves if proposed]
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("📅 Apply Proposed Quarters", disabled=not movable, use_container_width=True):
+                    moved = skipped = 0
+                    for feature_id, (year, quarter) in movable:
+                        half = "H1" if quarter in ("Q1", "Q2") else "H2"
+                        feature = st.session_state.features.get(feature_id)
+                        try:
+                            if not feature:
+                                raise ConflictError(feature_id, None, None)
+                            save_feature(dict(feature, year=year, quarter=quarter, half=half), feature['version'])
+                            moved += 1
+                        except ConflictError:
+                            skipped += 1  # changed by someone else since the schedule was computed
+                    flash(f"Moved {moved} feature(s) to their proposed quarters"
+                          + (f"; {skipped} changed meanwhile and were left alone" if skipped else ""), "📅")
+                    st.rerun()
+            with col2:
+                if st.button("🔁 Re-plan From Scratch", use_container_width=True):
+                    with portfolio.lock:
+                        scheduler.replan(capacities)
+                    st.rerun()
+        else:
+            st.success("✅ Every feature fits in its entered quarter")
+        
+        # Cross-BU Dependency Load
+        st.subheader("🔗 Cross-BU Dependency Load")
+        graph = st.session_state.dependency_graph
+        
+        weighted = st.radio("Measure", ["Asks", "Effort-weighted asks"], horizontal=True) != "Asks"
+        
+        col1, col2 = st.columns([3, 2])
+        
+        with portfolio.lock:
+            load_matrix = graph.load_matrix(BUSINESS_UNITS, BUSINESS_UNITS, weighted=weighted)
+            incoming = graph.incoming_asks(weighted=weighted)
+        
+        with col1:
+            fig = st.session_state.figure_cache.get(
+                ("dependency_heatmap", st.session_state.features.version, weighted),
+                lambda: px.imshow(load_matrix,
+                                  x=BUSINESS_UNITS, y=BUSINESS_UNITS,
+                                  labels={'x': 'Dependent Team', 'y': 'Owning BU', 'color': 'Load'},
+                                  text_auto=True, color_continuous_scale='Blues',
+                                  title="Asks from each BU (rows) to each team (columns)"))
+            st.plotly_chart(fig, use_container_width=True)
+        
+        with col2:
+            st.write("**Total incoming asks per team**")
+            for team in BUSINESS_UNITS:
+                st.markdown(f"<span class='{get_bu_badge(team)} badge'>{team}</span>: {incoming.get(team, 0)}",
+                            unsafe_allow_html=True)
+            
+            st.write("**Who needs a team in a quarter?**")
+            needed_team = st.selectbox("Team", BUSINESS_UNITS, key="dep_query_team")
+            needed_quarter = st.selectbox("Quarter", QUARTERS, key="dep_query_quarter")
+            with portfolio.lock:
+                needing = {feature_id: graph.teams_for(feature_id)[needed_team]
+                           for feature_id in graph.features_needing(needed_team, needed_quarter)}
+            if needing:
+                for feature_id, asks in needing.items():
+                    feature = st.session_state.features.get(feature_id)
+                    if feature is None:
+                        continue  # deleted by someone else since the lock was released
+                    st.write(f"• {feature_id}: {feature['title']} ({feature['bu']}, {feature['year']}) - "
+                             f"{asks} ask{'s' if asks != 1 else ''}")
+            else:
+                st.caption(f"No features need {needed_team} in {needed_quarter}")
+        
+        # Delivery order of features linked by "blocked by" dependencies
+        links = st.session_state.feature_links
+        with st.expander("⛓️ Delivery Order"):
+            rows = []
+            with portfolio.lock:
+                cyclic = links.cyclic_features()
+                for feature_id in links.topological_order():
+                    if not (links.blockers(feature_id) or links.blocked(feature_id)):
+                        continue
+                    feature = st.session_state.features.get(feature_id)
+                    chain, effort_points = links.critical_path(feature_id)
+                    rows.append({
+                        'ID': feature_id,
+                        'Title': feature['title'],
+                        'BU': feature['bu'],
+                        'Quarter': f"{feature['quarter']} {feature['year']}",
+                        'Blocked By': ', '.join(links.blockers(feature_id)) or '-',
+                        'Chain Length': chain,
+                        'Critical Path Effort': effort_points
+                    })
+            if cyclic:
+                st.warning(f"⚠️ These features are caught in a dependency cycle: {', '.join(cyclic)}")
+            if rows:
+                st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+            else:
+                st.caption("No feature is marked as blocked by another feature yet")
+        
         # Navigation
         col1, col2 = st.columns(2)
         with col1:
@@ -1387,42 +1885,13 @@ def step3_collaborate():
         
         # Voting Interface
         st.subheader("🗳️ Feature Review Board")
-        
-        # Create tabs for different feature types
-        tab1, tab2, tab3 = st.tabs(["Hero Big Rocks", "Big Rocks", "Small Rocks"])
-        
-        with tab1:
-            hero_features = [f for f in st.session_state.features if 'Hero' in f.get('type', '')]
-            display_voting_board(hero_features, pm_name)
-        
-        with tab2:
-            big_features = [f for f in st.session_state.features if 'Big' in f.get('type', '') and 'Hero' not in f.get('type', '')]
-            display_voting_board(big_features, pm_name)
-        
-        with tab3:
-            small_features = [f for f in st.session_state.features if 'Small' in f.get('type', '')]
-            display_voting_board(small_features, pm_name)
+        for key in ('board_change', 'results_change'):
+            st.session_state.pop(key, None)  # a full run draws the current data; the fragments poll from here
+        live_voting_board(pm_name)
         
         # Real-time Results
         st.subheader("📊 Voting Results")
-        
-        if st.session_state.votes:
-            votes_df = pd.DataFrame([
-                {"feature": k, "approve": v.get('approve', 0), "reject": v.get('reject', 0)}
-                for k, v in st.session_state.votes.items()
-            ])
-            
-            if not votes_df.empty:
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.dataframe(votes_df, use_container_width=True)
-                
-                with col2:
-                    fig = px.pie(votes_df.melt(id_vars=['feature'], 
-                                             value_vars=['approve', 'reject']),
-                               values='value', names='variable',
-                               title="Overall Voting Distribution")
-                    st.plotly_chart(fig, use_container_width=True)
+        live_voting_results()
         
         # Navigation
         col1, col2 = st.columns(2)
@@ -1433,6 +1902,73 @@ def step3_collaborate():
         
         st.markdown('</div>', unsafe_allow_html=True)
 
+def rerun_fragment_on_change(key):
+    """Called first in a polling fragment: reruns just that fragment once the shared change counter
+    has moved since its last run (st.session_state[key]); a full run only records the counter"""
+    change = portfolio.change_counter()
+    seen = st.session_state.get(key)
+    st.session_state[key] = change
+    if seen is not None and seen != change:
+        st.rerun(scope="fragment")
+
+@st.fragment(run_every=VOTE_REFRESH_SECONDS)
+def live_voting_board(pm_name):
+    """Review board; each tick redraws the cached cards (Streamlit clears whatever a fragment doesn't redraw)"""
+    if st.session_state.pop('voted', False):
+        st.rerun()  # the PM's own vote reruns the whole page, so the results show it too
+    rerun_fragment_on_change('board_change')
+    change = st.session_state.board_change
+    cached = st.session_state.get('board_rows')
+    if not cached or cached[0] != change:
+        features = st.session_state.features
+        rows = {rock_type: [feature for feature in map(features.get, st.session_state.facets.filter(type=rock_type))
+                            if feature] for rock_type in FEATURE_TYPES}
+        cached = st.session_state.board_rows = (change, rows)
+    _, rows = cached
+    
+    # Create tabs for different feature types
+    tab1, tab2, tab3 = st.tabs(["Hero Big Rocks", "Big Rocks", "Small Rocks"])
+    
+    for tab, rock_type in zip((tab1, tab2, tab3), FEATURE_TYPES):
+        with tab:
+            display_voting_board(rows[rock_type], pm_name)
+
+@st.fragment(run_every=VOTE_REFRESH_SECONDS)
+def live_voting_results():
+    """Tallies and distribution, rebuilt only when the shared change counter has moved"""
+    import pandas as pd  # deferred, like plotly: only the voting results need them
+    import plotly.express as px
+    
+    rerun_fragment_on_change('results_change')
+    change = st.session_state.results_change
+    cached = st.session_state.get('voting_results')
+    if not cached or cached[0] != change:
+        tallies = st.session_state.votes.tallies()
+        votes_df = pd.DataFrame([
+            {"feature": k, "approve": v.get('approve', 0), "reject": v.get('reject', 0)}
+            for k, v in tallies.items()
+        ])
+        cached = st.session_state.voting_results = (change, votes_df, st.session_state.votes.history()[::-1])
+    _, votes_df, history = cached
+    
+    if not votes_df.empty:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.dataframe(votes_df, use_container_width=True)
+        
+        with col2:
+            fig = st.session_state.figure_cache.get(
+                ("votes_pie", st.session_state.votes.version),
+                lambda: px.pie(votes_df.melt(id_vars=['feature'], 
+                                             value_vars=['approve', 'reject']),
+                               values='value', names='variable',
+                               title="Overall Voting Distribution"))
+            st.plotly_chart(fig, use_container_width=True)
+        
+        with st.expander("🧾 Vote History"):
+            st.dataframe(pd.DataFrame(history, columns=['Feature', 'PM', 'Vote', 'Time']),
+                         use_container_width=True, hide_index=True)
+
 def display_voting_board(features, pm_name):
     if not features:
         st.info("No features in this category")
@@ -1446,7 +1982,8 @@ def display_voting_board(features, pm_name):
                 badge_class = get_bu_badge(feature['bu'])
                 
                 # Get dependent teams summary
-                dependent_teams = list(set([dep.get('team', '') for dep in feature.get('dependency_details', []) if dep.get('team')]))
+                with portfolio.lock:
+                    dependent_teams = list(st.session_state.dependency_graph.teams_for(feature['id']))
                 deps_summary = ', '.join(dependent_teams) if dependent_teams else 'None'
                 total_deps = len(feature.get('dependency_details', []))
                 
@@ -1463,53 +2000,41 @@ def display_voting_board(features, pm_name):
                 </div>
                 """, unsafe_allow_html=True)
             
+            # Votes run as callbacks, before the board redraws, on the version that was on screen
             with col2:
                 vote_key = f"vote_{feature['id']}_{pm_name}"
-                if st.button(f"✅ Approve", key=f"approve_{vote_key}", use_container_width=True):
-                    vote_for_feature(feature['id'], pm_name, 'approve')
-                    st.success(f"Voted APPROVE for {feature['title']}")
-                    time.sleep(0.5)
-                    st.rerun()
+                st.button(f"✅ Approve", key=f"approve_{vote_key}", use_container_width=True,
+                          on_click=vote_for_feature, args=(feature, pm_name, 'approve'))
             
             with col3:
-                if st.button(f"❌ Reject", key=f"reject_{vote_key}", use_container_width=True):
-                    vote_for_feature(feature['id'], pm_name, 'reject')
-                    st.error(f"Voted REJECT for {feature['title']}")
-                    time.sleep(0.5)
-                    st.rerun()
+                st.button(f"❌ Reject", key=f"reject_{vote_key}", use_container_width=True,
+                          on_click=vote_for_feature, args=(feature, pm_name, 'reject'))
             
-            # Show current votes
-            current_votes = st.session_state.votes.get(feature['id'], {})
+            # Show current votes (each PM counts once, with their latest vote)
+            current_votes = st.session_state.votes.tally(feature['id'])
             approve_count = current_votes.get('approve', 0)
             reject_count = current_votes.get('reject', 0)
+            my_vote = st.session_state.votes.vote_of(feature['id'], pm_name)
             
-            st.caption(f"✅ {approve_count} approve | ❌ {reject_count} reject")
+            st.caption(f"✅ {approve_count} approve | ❌ {reject_count} reject"
+                       + (f" | Your vote: {my_vote}" if my_vote else ""))
 
-def vote_for_feature(feature_id, pm_name, vote_type):
-    if feature_id not in st.session_state.votes:
-        st.session_state.votes[feature_id] = {'approve': 0, 'reject': 0}
-    
-    st.session_state.votes[feature_id][vote_type] += 1
-    
-    # Update feature status based on votes
-    for feature in st.session_state.features:
-        if feature['id'] == feature_id:
-            votes = st.session_state.votes[feature_id]
-            total_votes = votes.get('approve', 0) + votes.get('reject', 0)
-            
-            if total_votes >= 3:  # Threshold for decision
-                if votes.get('approve', 0) > votes.get('reject', 0):
-                    feature['status'] = 'Approved'
-                else:
-                    feature['status'] = 'Rejected'
-            elif total_votes > 0:
-                feature['status'] = 'Under Review'
-            break
+def vote_for_feature(feature, pm_name, vote_type):
+    """Record a PM's vote (replacing their earlier one)"""
+    st.session_state.voted = True
+    try:
+        portfolio.vote(feature['id'], pm_name, vote_type)
+    except ConflictError as error:
+        flash(f"{error}. Your vote was not counted.", "⚠️")
+    else:
+        flash(f"Voted {vote_type.upper()} for {feature['title']}", "✅" if vote_type == 'approve' else "❌")
 
 # ======================
 # MAIN APP ROUTING
 # ======================
 def main():
+    show_flash_messages()
+    
     # Determine current page based on step
     current_step = st.session_state.get('step', 'home')
     
@@ -1531,6 +2056,7 @@ def main():
     # Footer
     st.divider()
     st.caption(f"AOP Planner Pro | {CURRENT_YEAR} Hackathon Edition | Built with Streamlit")
+    STARTUP.mark_ready()  # logs the startup report after the process's first full run
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,92 @@
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+
+CHUNK_BYTES = 1024 * 1024  # bytes read, hashed and written per step
+DIGEST_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+class AttachmentStore:
+    """Content-addressed files on disk, keyed by the SHA-256 of their bytes.
+
+    Uploads are streamed through in CHUNK_BYTES steps, so only one chunk is
+    held in memory, and the same bytes uploaded twice (re-attached on an
+    edit, or by another BU) are stored once. Files live under
+    root/<first 2 hex digits>/<digest> and are never changed once written.
+    Nothing is deleted when a feature goes away, since other features may
+    point at the same file.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(os.path.join(root, "tmp"), exist_ok=True)
+
+    def path(self, digest):
+        if not DIGEST_PATTERN.fullmatch(digest or ""):
+            raise ValueError(f"Not a SHA-256 digest: {digest!r}")
+        return os.path.join(self.root, digest[:2], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def size(self, digest):
+        return os.path.getsize(self.path(digest))
+
+    # Writes
+    def put(self, file):
+        """Copy a readable binary file in, returning (digest, size)"""
+        sha256 = hashlib.sha256()
+        size = 0
+        handle, temporary = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        try:
+            with os.fdopen(handle, "wb") as out:
+                while chunk := file.read(CHUNK_BYTES):
+                    sha256.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            digest = sha256.hexdigest()
+            target = self.path(digest)
+            if os.path.exists(target):
+                os.remove(temporary)  # already stored
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(temporary, target)  # atomic, so readers never see a partial file
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return digest, size
+
+    # Reads
+    def open(self, digest):
+        return open(self.path(digest), "rb")
+
+    def iter_range(self, digest, start=0, end=None):
+        """Bytes [start, end) of a file in CHUNK_BYTES pieces; end=None reads to the end"""
+        with self.open(digest) as file:
+            file.seek(start)
+            remaining = None if end is None else max(0, end - start)
+            while remaining is None or remaining > 0:
+                chunk = file.read(CHUNK_BYTES if remaining is None else min(CHUNK_BYTES, remaining))
+                if not chunk:
+                    return
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def read_range(self, digest, start=0, end=None):
+        return b"".join(self.iter_range(digest, start, end))
+
+
+def guess_mime(filename):
+    return mimetypes.guess_type(filename or "")[0] or "application/octet-stream"
+
+
+def format_size(size):
+    """1536 -> '1.5 KB'"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
@@ -0,0 +1,109 @@
+import csv
+import hashlib
+import re
+from collections import OrderedDict
+
+DEFAULT_KEYWORDS = {
+    "AI": 1,
+    "analytics": 1,
+    "mobile": 1,
+    "redesign": 1,
+    "automation": 1,
+    "customer": 1,
+    "dashboard": 1,
+}
+SCORE_SCALE = 2
+MAX_SCORE = 10
+
+_END = ""  # trie key marking the end of a term
+
+
+def load_keywords(path):
+    """Read 'term[,weight]' lines from a CSV/text file; weight defaults to 1"""
+    keywords = {}
+    with open(path, newline="", encoding="utf-8") as fh:
+        for row in csv.reader(fh):
+            if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+                continue
+            term = row[0].strip()
+            weight = float(row[1]) if len(row) > 1 and row[1].strip() else 1
+            keywords[term] = weight
+    return keywords
+
+
+def _trie_pattern(node):
+    """Regex for a trie node that prefers the longest term (greedy optional suffixes)"""
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch != _END]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if _END in node:
+        return "(?:" + body + ")?"
+    return body
+
+
+class KeywordMatcher:
+    """Case-insensitive multi-keyword matcher compiled into one regex automaton.
+
+    Terms are merged into a trie and emitted as a single regex inside a
+    lookahead, so each text is scanned once and every position reports its
+    longest matching term. Shorter terms matching at the same position are
+    exactly that term's prefixes, which are precomputed, so overlapping and
+    nested keywords are all found (same result as Aho-Corasick).
+    """
+
+    def __init__(self, keywords, cache_size=200_000):
+        self.weights = {}
+        for term, weight in keywords.items():
+            term = term.lower()
+            if term:
+                self.weights[term] = self.weights.get(term, 0) + weight
+
+        trie = {}
+        for term in self.weights:
+            node = trie
+            for ch in term:
+                node = node.setdefault(ch, {})
+            node[_END] = term
+        self._pattern = re.compile("(?=(" + _trie_pattern(trie) + "))") if self.weights else None
+
+        # term -> every term that is a prefix of it (itself included)
+        self._prefixes = {}
+        for term in self.weights:
+            node, found = trie, []
+            for ch in term:
+                node = node[ch]
+                if _END in node:
+                    found.append(node[_END])
+            self._prefixes[term] = tuple(found)
+
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # content hash -> score
+
+    def matches(self, text):
+        """Set of distinct terms found anywhere in text"""
+        found = set()
+        if self._pattern is None:
+            return found
+        for longest in set(m.group(1) for m in self._pattern.finditer(text.lower())):
+            found.update(self._prefixes[longest])
+        return found
+
+    def score_text(self, text):
+        """Weighted keyword score (distinct terms), cached by content hash"""
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        score = self._cache.get(key)
+        if score is not None:
+            self._cache.move_to_end(key)
+            return score
+        score = sum(self.weights[term] for term in self.matches(text))
+        self._cache[key] = score
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return score
+
+    def score_feature(self, feature):
+        """Competitor pressure (0-10) for a feature's title and description"""
+        # Newline keeps a keyword from matching across the title/description boundary
+        text = f"{feature.get('title', '')}\n{feature.get('description', '')}"
+        return min(round(self.score_text(text) * SCORE_SCALE, 1), MAX_SCORE)
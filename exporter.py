@@ -0,0 +1,144 @@
+import csv
+import importlib.util
+import io
+import json
+import tempfile
+from itertools import islice
+
+from ledger import VOTE_TYPES
+
+EXPORT_COLUMNS = ["id", "title", "description", "bu", "year", "half", "quarter", "type", "impact", "effort",
+                  "status", "rice_score", "competitor_score", "approve_votes", "reject_votes", "dependency_count",
+                  "dependent_teams", "dependencies", "blocked_by", "dependency_details", "submitted_by",
+                  "created_date"]
+EXPORT_FORMATS = {  # format -> (file extension, MIME type)
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+EXPORT_PACKAGES = {"parquet": "pyarrow", "xlsx": "openpyxl"}  # format -> optional package it needs
+CHUNK_ROWS = 5000  # rows formatted and written per chunk
+SPOOL_BYTES = 16 * 1024 * 1024  # exports larger than this spill from memory to a temp file
+
+
+# ======================
+# ROWS
+# ======================
+def export_rows(features, tallies):
+    """One flat row (list in EXPORT_COLUMNS order) per feature, generated lazily.
+
+    Dependencies become "Team: title; Team" text (the bulk import format),
+    the ids of blocking features, and the full details as a JSON string.
+    tallies is VoteLedger.tallies().
+    """
+    no_votes = dict.fromkeys(VOTE_TYPES, 0)
+    for feature in features:
+        details = feature.get('dependency_details') or []
+        tally = tallies.get(feature['id'], no_votes)
+        yield [
+            feature['id'],
+            feature.get('title', ''),
+            feature.get('description', ''),
+            feature.get('bu', ''),
+            feature.get('year'),
+            feature.get('half', ''),
+            feature.get('quarter', ''),
+            feature.get('type', ''),
+            feature.get('impact'),
+            feature.get('effort', ''),
+            feature.get('status', ''),
+            float(feature.get('rice_score') or 0),
+            float(feature.get('competitor_score') or 0),
+            tally['approve'],
+            tally['reject'],
+            len(details),
+            ", ".join(feature.get('dependent_teams') or []),
+            "; ".join(f"{dep['team']}: {dep['title']}" if dep.get('title') else dep.get('team', '')
+                      for dep in details),
+            ", ".join(dep['feature_id'] for dep in details if dep.get('feature_id')),
+            json.dumps(details) if details else "",
+            feature.get('submitted_by', ''),
+            feature.get('created_date', ''),
+        ]
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ======================
+# WRITERS (one chunk of rows in memory at a time)
+# ======================
+def write_csv(rows, out, chunk_rows=CHUNK_ROWS):
+    out.write("\ufeff".encode("utf-8"))  # BOM so Excel opens it as UTF-8
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in _chunks(rows, chunk_rows):
+        writer.writerows(chunk)
+        out.write(buffer.getvalue().encode("utf-8"))
+        buffer.seek(0)
+        buffer.truncate()
+    out.write(buffer.getvalue().encode("utf-8"))
+
+
+def write_parquet(rows, out, chunk_rows=CHUNK_ROWS):
+    import pyarrow as pa  # optional; only needed for Parquet exports
+    import pyarrow.parquet as pq
+
+    types = {"year": pa.int64(), "impact": pa.int64(), "rice_score": pa.float64(), "competitor_score": pa.float64(),
+             "approve_votes": pa.int64(), "reject_votes": pa.int64(), "dependency_count": pa.int64()}
+    schema = pa.schema([(column, types.get(column, pa.string())) for column in EXPORT_COLUMNS])
+    with pq.ParquetWriter(out, schema) as writer:
+        for chunk in _chunks(rows, chunk_rows):
+            # Each chunk becomes one row group
+            columns = zip(*chunk)
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema))
+
+
+def write_xlsx(rows, out, chunk_rows=None):
+    from openpyxl import Workbook  # optional; only needed for Excel exports
+
+    workbook = Workbook(write_only=True)  # rows go straight to the sheet's temp file
+    sheet = workbook.create_sheet("Features")
+    sheet.append(EXPORT_COLUMNS)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(out)
+
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet, "xlsx": write_xlsx}
+
+
+# ======================
+# EXPORT
+# ======================
+def missing_package(fmt):
+    """The optional package fmt needs when it isn't installed, else None"""
+    package = EXPORT_PACKAGES.get(fmt)
+    return package if package and importlib.util.find_spec(package) is None else None
+
+
+def export_features(features, tallies, fmt, chunk_rows=CHUNK_ROWS):
+    """Write features as fmt into a spooled temp file and return it rewound.
+
+    Writing holds one chunk of rows at a time, and the file moves from
+    memory to disk past SPOOL_BYTES. A caller that reads the file back
+    holds the whole export in memory; the download button does, since
+    Streamlit serves downloads from bytes. The caller owns (and should
+    close) the returned file.
+    """
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    try:
+        WRITERS[fmt](export_rows(features, tallies), out, chunk_rows)
+    except BaseException:
+        out.close()
+        raise
+    out.seek(0)
+    return out
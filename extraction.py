@@ -0,0 +1,209 @@
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+
+PASSAGE_WORDS = 200  # words per indexed passage
+PASSAGE_OVERLAP = 20  # words repeated at the start of the next passage, so phrases aren't cut in two
+EXTRACTOR_VERSION = 1  # bump to re-extract cached text after changing how it is produced
+MAX_WORKERS = 2
+_WORD = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+# ======================
+# TEXT EXTRACTION
+# ======================
+def extract_txt(path):
+    with open(path, "rb") as file:
+        return file.read().decode("utf-8", errors="replace")
+
+
+def extract_docx(path):
+    """Paragraph text from word/document.xml, streamed element by element"""
+    paragraphs = []
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as document:
+        words = []
+        for _, element in ElementTree.iterparse(document):
+            if element.tag == f"{_WORD}t" and element.text:
+                words.append(element.text)
+            elif element.tag == f"{_WORD}tab":
+                words.append("\t")
+            elif element.tag == f"{_WORD}p":
+                paragraphs.append("".join(words))
+                words = []
+                element.clear()
+    return "\n".join(paragraphs)
+
+
+def extract_pdf(path):
+    from pypdf import PdfReader  # optional; only needed for PDF PRDs
+
+    return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+
+EXTRACTORS = {".txt": extract_txt, ".docx": extract_docx, ".pdf": extract_pdf}
+
+
+def split_passages(text, words=PASSAGE_WORDS, overlap=PASSAGE_OVERLAP):
+    """Overlapping runs of about `words` words; [] for text without any"""
+    tokens = text.split()
+    step = max(1, words - overlap)
+    return [" ".join(tokens[start:start + words]) for start in range(0, max(len(tokens) - overlap, 1), step)
+            if tokens[start:start + words]]
+
+
+class ExtractionError(ValueError):
+    """A file that could not be read as its type (damaged, encrypted, not really a .docx, ...)"""
+
+
+def extract_passages(path, filename):
+    """Passages of a stored file's text, by the extension of its original filename.
+
+    Raises ImportError when the optional reader for the type is missing
+    and ExtractionError when the file can't be read.
+    """
+    extension = os.path.splitext(filename or "")[1].lower()
+    extractor = EXTRACTORS.get(extension)
+    if extractor is None:
+        raise ExtractionError(f"Can't extract text from '{extension or filename}' files")
+    try:
+        text = extractor(path)
+    except ImportError:
+        raise
+    except Exception as error:  # readers fail in many ways on a bad file
+        raise ExtractionError(f"Could not read {filename}: {error}") from error
+    return split_passages(text)
+
+
+# ======================
+# CACHE
+# ======================
+class TextCache:
+    """Extracted passages (or the reason there are none) on disk, one JSON file per content hash"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], f"{digest}.json")
+
+    def get(self, digest):
+        """(passages, error) as stored, or None if this file's text was never extracted"""
+        try:
+            with open(self._path(digest), encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version") != EXTRACTOR_VERSION:
+            return None
+        return entry.get("passages") or [], entry.get("error")
+
+    def put(self, digest, passages, error=None):
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(handle, "w", encoding="utf-8") as file:
+            json.dump({"version": EXTRACTOR_VERSION, "passages": passages, "error": error}, file)
+        os.replace(temporary, path)
+
+
+# ======================
+# BACKGROUND EXTRACTION
+# ======================
+class PrdExtractor:
+    """Extracts PRD text on a bounded thread pool and hands the passages to the search index.
+
+    Attach it to a FeatureRegistry: every feature whose prd_sha256 hasn't
+    been seen yet queues one job, so a save returns at once and new or
+    changed PRDs (and, after a restart, all of them) are indexed in the
+    background. Jobs are per file, not per feature, and check the
+    TextCache first, so a PRD shared by several features is read once.
+    on_passages(digest, passages) is called from a worker thread, under
+    lock; given prepare, on_passages gets prepare(passages) instead, worked
+    out before the lock is taken (e.g. tokenizing), so the lock is held
+    only to merge the result.
+    """
+
+    def __init__(self, attachments, cache, on_passages, lock, max_workers=MAX_WORKERS, prepare=None):
+        self.attachments = attachments
+        self.cache = cache
+        self.on_passages = on_passages
+        self.lock = lock
+        self.prepare = prepare
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prd-extract")
+        self._guard = threading.Lock()
+        self._status = {}  # digest -> "queued" | "done" | error message
+        self._passage_counts = {}  # digest -> passages indexed
+
+    # Registry index protocol
+    def add(self, feature):
+        self.queue(feature.get('prd_sha256'), feature.get('prd_file'))
+
+    def remove(self, feature):
+        pass  # the search index drops the feature's passages itself
+
+    def load_rows(self, snapshot, rows):
+        for digest, filename in zip(snapshot.column("prd_sha256", rows), snapshot.column("prd_file", rows)):
+            self.queue(digest, filename)
+
+    def clear(self):
+        pass  # extracted text stays valid for any feature that points at the same file
+
+    # Jobs
+    def queue(self, digest, filename):
+        if not digest:
+            return
+        with self._guard:
+            if digest in self._status:
+                return
+            self._status[digest] = "queued"
+        self._pool.submit(self._run, digest, filename)
+
+    def _run(self, digest, filename):
+        try:
+            passages, error = self._passages(digest, filename)
+            prepared = self.prepare(passages) if self.prepare else passages
+            with self.lock:
+                self.on_passages(digest, prepared)
+        except Exception as failure:  # a worker must always settle its job's status
+            passages, error = [], f"Indexing failed: {failure}"
+        with self._guard:
+            self._status[digest] = error or "done"
+            self._passage_counts[digest] = len(passages)
+
+    def _passages(self, digest, filename):
+        cached = self.cache.get(digest)
+        if cached is not None:
+            return cached
+        if not self.attachments.exists(digest):
+            return [], "The file's contents were not uploaded"
+        try:
+            passages, error = extract_passages(self.attachments.path(digest), filename), None
+        except ImportError as error:
+            # Not cached: installing the reader and restarting fixes it
+            return [], f"Reading {filename} needs the optional {error.name} package"
+        except ExtractionError as failure:
+            passages, error = [], str(failure)
+        self.cache.put(digest, passages, error)
+        return passages, error
+
+    # Progress
+    def status(self, digest):
+        """('queued' | 'done' | 'failed', passage count, error message or None) for one file"""
+        with self._guard:
+            state = self._status.get(digest)
+            count = self._passage_counts.get(digest, 0)
+        if state in (None, "queued", "done"):
+            return state, count, None
+        return "failed", count, state
+
+    def progress(self):
+        """(files finished, files seen) since startup"""
+        with self._guard:
+            return sum(state != "queued" for state in self._status.values()), len(self._status)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
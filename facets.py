@@ -0,0 +1,85 @@
+from registry import feature_seq
+
+FACET_FIELDS = ("bu", "status", "year", "type")
+FIELD_DEFAULTS = {"status": "Draft", "bu": "Unknown"}
+
+
+class FacetIndex:
+    """Inverted indexes (field value -> set of feature ids) for the list filters.
+
+    Attach it to a FeatureRegistry and it is updated on every save/delete.
+    A filter combination is a set intersection (smallest set first), and
+    facet counts are set sizes, so nothing scans the whole portfolio. The
+    same counts serve the sidebar stats and dashboard metrics.
+    """
+
+    def __init__(self, fields=FACET_FIELDS):
+        self.fields = fields
+        self._postings = {field: {} for field in fields}  # field -> value -> {ids}
+
+    def _value(self, feature, field):
+        return feature.get(field, FIELD_DEFAULTS.get(field))
+
+    # Registry index protocol
+    def add(self, feature):
+        for field in self.fields:
+            self._postings[field].setdefault(self._value(feature, field), set()).add(feature['id'])
+
+    def remove(self, feature):
+        for field in self.fields:
+            value = self._value(feature, field)
+            ids = self._postings[field].get(value)
+            if ids is not None:
+                ids.discard(feature['id'])
+                if not ids:
+                    del self._postings[field][value]
+
+    def load_rows(self, snapshot, rows):
+        """Bulk-load snapshot rows straight from their columns"""
+        for field in self.fields:
+            postings = self._postings[field]
+            for value, ids in snapshot.group_ids(field, rows).items():
+                value = FIELD_DEFAULTS.get(field) if value is None else value
+                postings.setdefault(value, set()).update(ids)
+
+    def clear(self):
+        self._postings = {field: {} for field in self.fields}
+
+    # Queries
+    def values(self, field):
+        """Distinct values currently present for a field, sorted"""
+        return sorted(self._postings[field])
+
+    def count(self, field, value):
+        """Number of features with field == value, in O(1)"""
+        return len(self._postings[field].get(value, ()))
+
+    def _matching(self, criteria):
+        """Id set matching every criterion, or None when there are no criteria"""
+        postings = []
+        for field, value in criteria.items():
+            ids = self._postings[field].get(value)
+            if not ids:
+                return set()
+            postings.append(ids)
+        if not postings:
+            return None
+        postings.sort(key=len)
+        return postings[0].intersection(*postings[1:])
+
+    def ids(self, **criteria):
+        """Unordered set of ids matching all field=value criteria; None if no criteria given"""
+        return self._matching(criteria)
+
+    def filter(self, **criteria):
+        """Ids matching all field=value criteria, oldest first; None if no criteria given"""
+        ids = self._matching(criteria)
+        return None if ids is None else sorted(ids, key=feature_seq)
+
+    def counts(self, field, **criteria):
+        """{value: count} for one field, restricted by the other active criteria"""
+        criteria = {f: v for f, v in criteria.items() if f != field}
+        base = self._matching(criteria)
+        if base is None:
+            return {value: len(ids) for value, ids in self._postings[field].items()}
+        return {value: len(ids & base) for value, ids in self._postings[field].items()}
@@ -0,0 +1,27 @@
+from collections import OrderedDict
+
+
+class FigureCache:
+    """Bounded LRU cache of Plotly figures.
+
+    Keys combine a chart name, the version of the data behind it and any
+    chart parameters, so a figure is rebuilt only when its inputs change.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._figures = OrderedDict()
+
+    def get(self, key, build):
+        """Return the cached figure for key, calling build() on a miss"""
+        fig = self._figures.get(key)
+        if fig is not None:
+            self._figures.move_to_end(key)
+            return fig
+        fig = self._figures[key] = build()
+        while len(self._figures) > self.max_entries:
+            self._figures.popitem(last=False)
+        return fig
+
+    def clear(self):
+        self._figures.clear()
@@ -0,0 +1,146 @@
+from registry import RowBacklog
+
+EFFORT_SIZES = ["XS", "S", "M", "L", "XL"]
+COLUMNS = [
+    "title", "description", "bu", "year", "half", "quarter", "type", "impact", "effort",
+    "status", "rice_score", "competitor_score", "dependent_teams", "dependency_count",
+    "submitted_by", "created_date",
+]
+CATEGORICAL = ["bu", "status", "type", "effort"]
+NUMERIC = {"year": "Int64", "impact": "Int64", "rice_score": "float64", "competitor_score": "float64",
+           "dependency_count": "int64"}
+DEFAULTS = {"status": "Draft", "rice_score": 0, "competitor_score": 0}
+FRAME_FIELDS = tuple(COLUMNS) + ("dependency_details",)
+
+
+def dependent_teams_summary(dependency_details):
+    """'Team A, Team B' in first-mentioned order, or 'None'"""
+    teams = dict.fromkeys(dep.get('team') for dep in dependency_details or [] if dep.get('team'))
+    return ', '.join(teams) if teams else 'None'
+
+
+def feature_row(feature):
+    """Flat, table-friendly values for one feature (dependency columns precomputed)"""
+    row = {column: feature.get(column, DEFAULTS.get(column)) for column in COLUMNS}
+    row["dependent_teams"] = dependent_teams_summary(feature.get('dependency_details'))
+    row["dependency_count"] = len(feature.get('dependency_details') or [])
+    return row
+
+
+class FeatureFrame:
+    """Materialized, columnar DataFrame view of the portfolio, indexed by feature id.
+
+    Attach it to a FeatureRegistry: saves and deletes are queued as row
+    changes and applied in one batch the next time the frame is read, so the
+    frame is never rebuilt from the full list of dicts. bu/status/type/effort
+    use categorical dtypes (effort ordered XS < ... < XL). Rows loaded from
+    a snapshot join the pending changes on the first read. pandas is
+    imported on that first read, not when the frame is attached.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    # Registry index protocol
+    def add(self, feature):
+        if self._backlog:
+            self._backlog.discard(feature['id'])
+        self._deleted.discard(feature['id'])
+        self._pending[feature['id']] = feature
+
+    def remove(self, feature):
+        if self._backlog:
+            self._backlog.discard(feature['id'])
+        self._pending.pop(feature['id'], None)
+        self._deleted.add(feature['id'])
+
+    def patch(self, features, fields):
+        """Derived fields (e.g. scores) are applied column-wise instead of rebuilding rows"""
+        for field in fields:
+            if field in COLUMNS and field not in CATEGORICAL:
+                values = self._patched.setdefault(field, {})
+                for feature in features:
+                    values[feature['id']] = feature.get(field)
+
+    def load_rows(self, snapshot, rows):
+        self._backlog = RowBacklog(snapshot, rows, FRAME_FIELDS)
+
+    def clear(self):
+        self._backlog = None  # snapshot rows not queued yet
+        self._frame = None  # built on the first read
+        self._pending = {}  # id -> feature to (re)write
+        self._deleted = set()
+        self._patched = {}  # column -> {id: value}
+
+    def _empty(self):
+        import pandas as pd  # deferred; pages that never read the frame don't pay for it
+        frame = pd.DataFrame(columns=COLUMNS, index=pd.Index([], name="id"))
+        return self._with_dtypes(frame)
+
+    def _with_dtypes(self, frame):
+        import pandas as pd
+        for column in CATEGORICAL:
+            if column == "effort":
+                frame[column] = pd.Categorical(frame[column], categories=EFFORT_SIZES, ordered=True)
+            else:
+                frame[column] = frame[column].astype("category")
+        return frame.astype(NUMERIC)
+
+    # Reads
+    def frame(self):
+        """The up-to-date DataFrame (callers must not modify it in place).
+
+        Changes go into a copy, so a frame handed out earlier (possibly to
+        another session) never changes under its reader.
+        """
+        import pandas as pd
+        if self._frame is None:
+            self._frame = self._empty()
+        backlog, self._backlog = self._backlog, None
+        if backlog:
+            # Ahead of anything already pending, which is newer
+            pending, self._pending = self._pending, {}
+            backlog.drain(self.add)
+            self._pending.update(pending)
+        if self._deleted or self._pending or self._patched:
+            self._frame = self._frame.copy()
+        if self._deleted:
+            self._frame = self._frame.drop(index=list(self._deleted), errors="ignore")
+            self._deleted = set()
+        if self._pending:
+            self._apply(self._pending)
+            self._pending = {}
+        if self._patched:
+            for column, values in self._patched.items():
+                positions = self._frame.index.get_indexer(list(values))
+                found = positions >= 0
+                patched = self._frame[column].to_numpy(copy=True)
+                patched[positions[found]] = pd.array(list(values.values()), dtype=patched.dtype)[found]
+                self._frame[column] = patched
+            self._patched = {}
+        return self._frame
+
+    def _apply(self, pending):
+        import pandas as pd
+        rows = pd.DataFrame.from_dict({feature_id: feature_row(feature) for feature_id, feature in pending.items()},
+                                      orient="index", columns=COLUMNS)
+        rows.index.name = "id"
+        rows = self._with_dtypes(rows)
+
+        # Grow the category sets so existing and new rows share one dtype
+        frame = self._frame
+        for column in CATEGORICAL:
+            if column == "effort":
+                continue
+            added = rows[column].cat.categories.difference(frame[column].cat.categories)
+            if len(added):
+                frame[column] = frame[column].cat.add_categories(added)
+            rows[column] = rows[column].cat.set_categories(frame[column].cat.categories)
+
+        existing = rows.index.intersection(frame.index)
+        if len(existing):
+            frame.loc[existing, COLUMNS] = rows.loc[existing, COLUMNS]
+        new = rows.index.difference(frame.index, sort=False)
+        if len(new):
+            frame = rows.loc[new] if frame.empty else pd.concat([frame, rows.loc[new]])
+        self._frame = frame
@@ -0,0 +1,123 @@
+from collections import Counter
+
+from registry import RowBacklog
+from scoring import DEFAULT_EFFORT, EFFORT_POINTS
+
+GRAPH_FIELDS = ("bu", "year", "quarter", "effort", "dependency_details")
+
+
+class _Edges:
+    """What a feature asks of other teams, remembered so it can be retracted"""
+
+    __slots__ = ("bu", "year", "quarter", "effort", "teams")
+
+    def __init__(self, feature):
+        self.bu = feature.get('bu')
+        self.year = feature.get('year')
+        self.quarter = feature.get('quarter')
+        self.effort = EFFORT_POINTS.get(feature.get('effort', DEFAULT_EFFORT), EFFORT_POINTS[DEFAULT_EFFORT])
+        self.teams = Counter(dep['team'] for dep in feature.get('dependency_details') or [] if dep.get('team'))
+
+
+class DependencyGraph:
+    """Sparse feature <-> team dependency graph, maintained incrementally.
+
+    Edges go from a feature to each team it depends on. An edge carries
+    the number of asks (dependency entries) and an effort weight (the
+    feature's effort points times the asks). Attach it to a FeatureRegistry;
+    each save/delete only touches that feature's edges. Rows loaded from a
+    snapshot are added on the first query.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    # Registry index protocol
+    def add(self, feature):
+        if self._backlog:
+            self._backlog.discard(feature['id'])
+        edges = _Edges(feature)
+        if not edges.teams:
+            return
+        feature_id = feature['id']
+        self._edges[feature_id] = edges
+        for team, asks in edges.teams.items():
+            self._team_features.setdefault(team, {})[feature_id] = asks
+            self._team_quarter.setdefault((team, edges.quarter), set()).add(feature_id)
+            self._asks[team] += asks
+            self._load[team] += asks * edges.effort
+            self._matrix_asks[(edges.bu, team)] += asks
+            self._matrix_effort[(edges.bu, team)] += asks * edges.effort
+
+    def remove(self, feature):
+        feature_id = feature['id']
+        if self._backlog:
+            self._backlog.discard(feature_id)
+        edges = self._edges.pop(feature_id, None)
+        if edges is None:
+            return
+        for team, asks in edges.teams.items():
+            del self._team_features[team][feature_id]
+            if not self._team_features[team]:
+                del self._team_features[team]
+            key = (team, edges.quarter)
+            self._team_quarter[key].discard(feature_id)
+            if not self._team_quarter[key]:
+                del self._team_quarter[key]
+            for counter, amount in ((self._asks, asks), (self._load, asks * edges.effort)):
+                counter[team] -= amount
+                if not counter[team]:
+                    del counter[team]
+            pair = (edges.bu, team)
+            for counter, amount in ((self._matrix_asks, asks), (self._matrix_effort, asks * edges.effort)):
+                counter[pair] -= amount
+                if not counter[pair]:
+                    del counter[pair]
+
+    def load_rows(self, snapshot, rows):
+        # Only features with dependency entries have edges
+        self._backlog = RowBacklog(snapshot, snapshot.rows_with_dependencies(rows), GRAPH_FIELDS)
+
+    def _load_backlog(self):
+        backlog, self._backlog = self._backlog, None
+        if backlog:
+            backlog.drain(self.add)
+
+    def clear(self):
+        self._backlog = None  # snapshot rows not added yet
+        self._edges = {}  # feature id -> _Edges
+        self._team_features = {}  # team -> {feature id: asks}
+        self._team_quarter = {}  # (team, quarter) -> {feature ids}
+        self._asks = Counter()  # team -> incoming asks
+        self._load = Counter()  # team -> incoming effort-weighted asks
+        self._matrix_asks = Counter()  # (owning BU, team) -> asks
+        self._matrix_effort = Counter()  # (owning BU, team) -> effort-weighted asks
+
+    # Queries
+    def teams_for(self, feature_id):
+        """{team: asks} for one feature"""
+        self._load_backlog()
+        edges = self._edges.get(feature_id)
+        return dict(edges.teams) if edges else {}
+
+    def features_needing(self, team, quarter=None, year=None):
+        """Ids of features that depend on team, optionally only those planned for a quarter/year"""
+        self._load_backlog()
+        if quarter is None:
+            ids = self._team_features.get(team, {})
+        else:
+            ids = self._team_quarter.get((team, quarter), ())
+        if year is None:
+            return list(ids)
+        return [feature_id for feature_id in ids if self._edges[feature_id].year == year]
+
+    def incoming_asks(self, weighted=False):
+        """{team: total asks} (or effort-weighted load) across the portfolio"""
+        self._load_backlog()
+        return dict(self._load if weighted else self._asks)
+
+    def load_matrix(self, owners, teams, weighted=False):
+        """owners x teams matrix (list of rows) of asks, or effort-weighted asks"""
+        self._load_backlog()
+        cells = self._matrix_effort if weighted else self._matrix_asks
+        return [[cells.get((owner, team), 0) for team in teams] for owner in owners]
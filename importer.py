@@ -0,0 +1,262 @@
+import codecs
+import csv
+import json
+import os
+import time
+from datetime import datetime
+
+from registry import ID_PATTERN
+from scoring import EFFORT_POINTS
+
+HALF_QUARTERS = {"H1": ("Q1", "Q2"), "H2": ("Q3", "Q4")}
+IMPORT_COLUMNS = ["title", "description", "bu", "year", "half", "quarter", "type", "impact", "effort",
+                  "status", "submitted_by", "dependencies"]
+IMPORT_FORMATS = ("csv", "jsonl", "xlsx")
+BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 500  # keep the report small however bad the file is
+
+
+class RowError(ValueError):
+    """One or more problems with a single input row"""
+
+
+class ImportReport:
+    """Outcome of one import: counts plus the first MAX_REPORTED_ERRORS row errors"""
+
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []  # [(row number, message)], row 1 is the first data row
+        self.elapsed = 0.0
+
+    def add_error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+
+
+# ======================
+# READERS (streaming; one row in memory at a time)
+# ======================
+def read_csv(file):
+    yield from csv.DictReader(codecs.iterdecode(file, "utf-8-sig"))
+
+
+def read_jsonl(file):
+    for line in file:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                yield RowError(f"Invalid JSON: {error.msg}")
+
+
+def read_xlsx(file):
+    from openpyxl import load_workbook  # optional; only needed for Excel files
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else "" for cell in next(rows, ())]
+        for values in rows:
+            if any(value not in (None, "") for value in values):
+                yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl, "xlsx": read_xlsx}
+
+
+def detect_format(filename):
+    extension = os.path.splitext(filename)[1].lower().lstrip(".")
+    extension = {"json": "jsonl", "ndjson": "jsonl", "xlsm": "xlsx"}.get(extension, extension)
+    if extension not in READERS:
+        raise ValueError(f"Unsupported file type '.{extension}' (use {', '.join(IMPORT_FORMATS)})")
+    return extension
+
+
+# ======================
+# VALIDATION
+# ======================
+def _text(value):
+    return "" if value is None else str(value).strip()
+
+
+class RowValidator:
+    """Turns a raw row (dict of column -> value) into a feature dict, or raises RowError.
+
+    Dependencies may be given as a list of {team, title, description,
+    feature_id} objects (JSONL), a JSON string of the same (the
+    dependency_details column of an export), or "Team: title; Team" text
+    (CSV/Excel). feature_id, the existing feature the dependency is
+    blocked by, is optional; given features (e.g. the FeatureRegistry), it
+    must exist and belong to the dependency's team. Rows can't point at
+    other rows of the same file, which have no ids yet.
+    """
+
+    def __init__(self, business_units, feature_types, statuses, years, submitted_by="Bulk Import", features=None):
+        self.business_units = set(business_units)
+        self.feature_types = set(feature_types)
+        self.statuses = set(statuses)
+        self.years = set(years)
+        self.submitted_by = submitted_by
+        self.features = features
+
+    def _dependencies(self, value, problems):
+        if value in (None, ""):
+            return []
+        if isinstance(value, str) and value.lstrip().startswith("["):
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                problems.append("dependencies: invalid JSON")
+                return []
+        if isinstance(value, str):
+            value = [dict(zip(("team", "title"), (part.strip() for part in item.split(":", 1))))
+                     for item in value.split(";") if item.strip()]
+        if not isinstance(value, list):
+            problems.append("dependencies: expected a list")
+            return []
+        details = []
+        for dep in value:
+            dep = {"team": dep} if isinstance(dep, str) else dep
+            if not isinstance(dep, dict):
+                problems.append("dependencies: each entry needs a team")
+                continue
+            team = _text(dep.get("team"))
+            if team not in self.business_units:
+                problems.append(f"dependencies: unknown team '{team}'")
+                continue
+            detail = {"team": team, "title": _text(dep.get("title")), "description": _text(dep.get("description"))}
+            blocker_id = _text(dep.get("feature_id")).upper()
+            if blocker_id:
+                if not ID_PATTERN.match(blocker_id):
+                    problems.append(f"dependencies: '{blocker_id}' is not a feature id")
+                    continue
+                if self.features is not None:
+                    blocker = self.features.get(blocker_id)
+                    if blocker is None:
+                        problems.append(f"dependencies: no feature {blocker_id}")
+                        continue
+                    if blocker.get("bu") != team:
+                        problems.append(f"dependencies: {blocker_id} belongs to {blocker.get('bu')}, not {team}")
+                        continue
+                detail["feature_id"] = blocker_id
+            details.append(detail)
+        return details
+
+    def validate(self, row):
+        if isinstance(row, RowError):
+            raise row
+        if not isinstance(row, dict):
+            raise RowError("expected an object with feature fields")
+        problems = []
+        title = _text(row.get("title"))
+        description = _text(row.get("description"))
+        if not title:
+            problems.append("title is required")
+        if not description:
+            problems.append("description is required")
+
+        bu = _text(row.get("bu"))
+        if bu not in self.business_units:
+            problems.append(f"unknown bu '{bu}'")
+
+        year = None
+        try:
+            year = int(float(_text(row.get("year"))))
+        except (ValueError, OverflowError):
+            problems.append(f"year '{_text(row.get('year'))}' is not a number")
+        if year is not None and year not in self.years:
+            problems.append(f"year {year} is outside {min(self.years)}-{max(self.years)}")
+
+        quarter = _text(row.get("quarter")).upper()
+        half = _text(row.get("half")).upper() or next((h for h, qs in HALF_QUARTERS.items() if quarter in qs), "")
+        if half not in HALF_QUARTERS:
+            problems.append(f"half '{half}' must be H1 or H2")
+        elif quarter not in HALF_QUARTERS[half]:
+            problems.append(f"quarter '{quarter}' is not in {half} ({'/'.join(HALF_QUARTERS[half])})")
+
+        feature_type = _text(row.get("type"))
+        if feature_type not in self.feature_types:
+            problems.append(f"unknown type '{feature_type}'")
+
+        impact = None
+        try:
+            impact = int(float(_text(row.get("impact")) or 7))
+        except (ValueError, OverflowError):
+            problems.append(f"impact '{_text(row.get('impact'))}' is not a number")
+        if impact is not None and not 1 <= impact <= 10:
+            problems.append(f"impact {impact} must be between 1 and 10")
+
+        effort = _text(row.get("effort")).upper() or "M"
+        if effort not in EFFORT_POINTS:
+            problems.append(f"effort '{effort}' must be one of {', '.join(EFFORT_POINTS)}")
+
+        status = _text(row.get("status")) or "Draft"
+        if status not in self.statuses:
+            problems.append(f"unknown status '{status}'")
+
+        # An export's dependency_details JSON keeps blocker ids that its dependencies text leaves out
+        dependency_details = self._dependencies(row.get("dependency_details") or row.get("dependencies"), problems)
+        if problems:
+            raise RowError("; ".join(problems))
+
+        return {
+            "id": None,
+            "title": title,
+            "description": description,
+            "bu": bu,
+            "year": year,
+            "half": half,
+            "quarter": quarter,
+            "type": feature_type,
+            "impact": impact,
+            "effort": effort,
+            "dependency_details": dependency_details,
+            "dependent_teams": list(dict.fromkeys(dep["team"] for dep in dependency_details)),
+            "prd_file": None,
+            "mockup_file": None,
+            "submitted_by": _text(row.get("submitted_by")) or self.submitted_by,
+            "status": status,
+            "rice_score": 0,
+            "competitor_score": 0,
+            "created_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+
+# ======================
+# IMPORT
+# ======================
+def import_features(file, filename, validator, write_batch, batch_size=BATCH_SIZE, progress=None):
+    """Stream rows from file, validate each, and hand valid features to write_batch in batches.
+
+    write_batch(features) must persist a batch atomically (e.g.
+    SharedPortfolio.add_features). progress(rows_done) is called after each
+    batch. Returns an ImportReport.
+    """
+    report = ImportReport()
+    started = time.perf_counter()
+    batch = []
+    row_number = 0
+
+    def flush():
+        write_batch(batch)
+        report.imported += len(batch)
+        batch.clear()
+        if progress:
+            progress(row_number)
+
+    for row_number, row in enumerate(READERS[detect_format(filename)](file), start=1):
+        try:
+            batch.append(validator.validate(row))
+        except RowError as error:
+            report.add_error(row_number, str(error))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    report.elapsed = time.perf_counter() - started
+    return report
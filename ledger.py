@@ -0,0 +1,106 @@
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+VOTE_TYPES = ("approve", "reject")
+DECISION_THRESHOLD = 3  # distinct PM votes needed before a feature is approved/rejected
+
+VoteEntry = namedtuple("VoteEntry", ["feature_id", "pm", "vote", "ts"])
+
+
+def decide_status(tally, current_status):
+    """Status implied by a feature's tally (current_status when nobody voted)"""
+    total = tally['approve'] + tally['reject']
+    if total >= DECISION_THRESHOLD:
+        return 'Approved' if tally['approve'] > tally['reject'] else 'Rejected'
+    if total > 0:
+        return 'Under Review'
+    return current_status
+
+
+class VoteLedger:
+    """Append-only history of PM votes with maintained per-feature tallies.
+
+    Every vote is kept as an entry (feature_id, pm, vote, ts); a PM's latest
+    vote on a feature replaces their earlier one in the tally, so voting
+    again changes your vote instead of adding another. Recording a vote is
+    O(1); the tallies can always be rebuilt by replaying the entries.
+    Safe to share between sessions: every method holds a short internal lock.
+    """
+
+    def __init__(self, entries=()):
+        self._lock = threading.Lock()
+        self.version = 0  # moves on every change, never goes back
+        self.clear()
+        self.replay(entries)
+
+    def clear(self):
+        with self._lock:
+            self._history = {}  # feature id -> [VoteEntry], oldest first
+            self._current = {}  # feature id -> {pm: vote}
+            self._tallies = {}  # feature id -> {'approve': n, 'reject': n}
+            self.version += 1
+
+    def replay(self, entries):
+        """Apply entries in order, as if they were recorded now"""
+        with self._lock:
+            for entry in entries:
+                self._apply(VoteEntry(*entry))
+            self.version += 1
+
+    def _apply(self, entry):
+        if entry.vote not in VOTE_TYPES:
+            raise ValueError(f"Unknown vote '{entry.vote}'")
+        self._history.setdefault(entry.feature_id, []).append(entry)
+        current = self._current.setdefault(entry.feature_id, {})
+        tally = self._tallies.setdefault(entry.feature_id, dict.fromkeys(VOTE_TYPES, 0))
+        previous = current.get(entry.pm)
+        if previous is not None:
+            tally[previous] -= 1
+        current[entry.pm] = entry.vote
+        tally[entry.vote] += 1
+        return tally
+
+    # Writes
+    def record(self, feature_id, pm, vote, ts=None):
+        """Append a vote; returns the new entry"""
+        entry = VoteEntry(feature_id, pm, vote, ts or datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        with self._lock:
+            self._apply(entry)
+            self.version += 1
+        return entry
+
+    def forget(self, feature_id):
+        """Drop everything about a deleted feature"""
+        with self._lock:
+            if self._history.pop(feature_id, None) is not None:
+                del self._current[feature_id]
+                del self._tallies[feature_id]
+                self.version += 1
+
+    # Reads
+    def tally(self, feature_id):
+        """{'approve': n, 'reject': n} counting each PM's latest vote once"""
+        with self._lock:
+            return dict(self._tallies.get(feature_id) or dict.fromkeys(VOTE_TYPES, 0))
+
+    def tallies(self):
+        """{feature id: tally} for every feature with votes"""
+        with self._lock:
+            return {feature_id: dict(tally) for feature_id, tally in self._tallies.items()}
+
+    def vote_of(self, feature_id, pm):
+        """The PM's current vote on a feature, or None"""
+        with self._lock:
+            return self._current.get(feature_id, {}).get(pm)
+
+    def history(self, feature_id=None):
+        """Entries for one feature, or all entries, oldest first"""
+        with self._lock:
+            if feature_id is not None:
+                return list(self._history.get(feature_id, ()))
+            entries = [entry for entries in self._history.values() for entry in entries]
+        return sorted(entries, key=lambda entry: entry.ts)
+
+    def __bool__(self):
+        return bool(self._tallies)
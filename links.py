@@ -0,0 +1,144 @@
+from collections import deque
+
+from scoring import DEFAULT_EFFORT, EFFORT_POINTS
+
+
+def feature_blockers(feature):
+    """Ids of the features this feature's dependency entries point at"""
+    return {dep['feature_id'] for dep in feature.get('dependency_details') or []
+            if dep.get('feature_id') and dep['feature_id'] != feature.get('id')}
+
+
+class FeatureLinks:
+    """Feature-to-feature 'blocked by' links with ordering and cycle checks.
+
+    A dependency entry may name the feature it waits on ('feature_id');
+    that feature must be delivered first. Attach this index to a
+    FeatureRegistry to keep the adjacency current. Links to features that
+    don't exist (any more) are kept but count as satisfied.
+
+    find_cycle() runs before a save and only walks what is downstream of
+    the edited feature. The topological order and critical paths are
+    computed in one O(V + E) pass and cached until the next change.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    # Registry index protocol
+    def add(self, feature):
+        feature_id = feature['id']
+        self._effort[feature_id] = EFFORT_POINTS.get(feature.get('effort', DEFAULT_EFFORT), EFFORT_POINTS[DEFAULT_EFFORT])
+        blockers = feature_blockers(feature)
+        if blockers:
+            self._blockers[feature_id] = blockers
+            for blocker in blockers:
+                self._blocks.setdefault(blocker, set()).add(feature_id)
+        self._ordering = None
+
+    def load_rows(self, snapshot, rows):
+        """Bulk-load snapshot rows: efforts from the column, links from the dependency table"""
+        ids = snapshot.column('id', rows)
+        self._effort.update(zip(ids, snapshot.array('effort', EFFORT_POINTS[DEFAULT_EFFORT], EFFORT_POINTS,
+                                                    rows=rows).tolist()))
+        dependencies = snapshot.dependency_rows(rows)
+        dependencies = dependencies.filter(dependencies.column('feature_id').is_valid())
+        all_ids = ids if rows is None else snapshot.column('id')
+        for row, blocker in zip(dependencies.column('row').to_pylist(), dependencies.column('feature_id').to_pylist()):
+            feature_id = all_ids[row]
+            if blocker and blocker != feature_id:
+                self._blockers.setdefault(feature_id, set()).add(blocker)
+                self._blocks.setdefault(blocker, set()).add(feature_id)
+        self._ordering = None
+
+    def remove(self, feature):
+        feature_id = feature['id']
+        self._effort.pop(feature_id, None)
+        for blocker in self._blockers.pop(feature_id, ()):
+            dependents = self._blocks[blocker]
+            dependents.discard(feature_id)
+            if not dependents:
+                del self._blocks[blocker]
+        self._ordering = None
+
+    def clear(self):
+        self._effort = {}  # feature id -> effort points (present features only)
+        self._blockers = {}  # feature id -> {ids it waits on}
+        self._blocks = {}  # feature id -> {ids waiting on it}
+        self._ordering = None
+
+    # Adjacency
+    def blockers(self, feature_id):
+        return sorted(self._blockers.get(feature_id, ()))
+
+    def blocked(self, feature_id):
+        return sorted(self._blocks.get(feature_id, ()))
+
+    def find_cycle(self, feature_id, blockers):
+        """Cycle that saving feature_id with these blockers would create, or None.
+
+        Returns the loop as a list of ids (feature_id ... feature_id).
+        """
+        if feature_id is None:
+            return None  # a new feature has nothing waiting on it yet
+        if feature_id in blockers:
+            return [feature_id, feature_id]
+        # A cycle exists iff a new blocker is already downstream of feature_id
+        parents = {feature_id: None}
+        stack = [feature_id]
+        while stack:
+            current = stack.pop()
+            for dependent in self._blocks.get(current, ()):
+                if dependent in parents:
+                    continue
+                parents[dependent] = current
+                if dependent in blockers:
+                    path = [dependent]
+                    while path[-1] != feature_id:
+                        path.append(parents[path[-1]])
+                    return [feature_id] + path
+                stack.append(dependent)
+        return None
+
+    # Ordering
+    def _compute(self):
+        """Kahn's algorithm over present features; also longest (critical) paths"""
+        indegree = {feature_id: 0 for feature_id in self._effort}
+        for feature_id, blockers in self._blockers.items():
+            indegree[feature_id] = sum(1 for blocker in blockers if blocker in self._effort)
+
+        queue = deque(sorted(feature_id for feature_id, degree in indegree.items() if not degree))
+        order = []
+        depth = {}
+        path = {}  # feature id -> effort points along the heaviest chain ending here
+        while queue:
+            feature_id = queue.popleft()
+            order.append(feature_id)
+            blockers = [blocker for blocker in self._blockers.get(feature_id, ()) if blocker in self._effort]
+            depth[feature_id] = 1 + max((depth[blocker] for blocker in blockers), default=0)
+            path[feature_id] = self._effort[feature_id] + max((path[blocker] for blocker in blockers), default=0)
+            for dependent in self._blocks.get(feature_id, ()):
+                if dependent in indegree:
+                    indegree[dependent] -= 1
+                    if not indegree[dependent]:
+                        queue.append(dependent)
+
+        cyclic = sorted(feature_id for feature_id in indegree if feature_id not in depth)
+        self._ordering = (order, depth, path, cyclic)
+        return self._ordering
+
+    def ordering(self):
+        return self._ordering or self._compute()
+
+    def topological_order(self):
+        """Present feature ids, every feature after the features it waits on"""
+        return self.ordering()[0]
+
+    def critical_path(self, feature_id):
+        """(chain length in features, effort points) of the longest blocker chain ending at feature_id"""
+        _, depth, path, _ = self.ordering()
+        return depth.get(feature_id, 0), path.get(feature_id, 0)
+
+    def cyclic_features(self):
+        """Features stuck in (or behind) a cycle, e.g. from imported data"""
+        return self.ordering()[3]
@@ -0,0 +1,127 @@
+import numpy as np
+
+from scoring import DEFAULT_EFFORT, EFFORT_POINTS
+
+EXCLUDED_STATUSES = ("Rejected",)
+DEFAULT_CAPACITY = 20  # effort points a BU can deliver per quarter
+MAX_DP_CELLS = 20_000_000  # candidates x capacity above which the greedy fallback is used
+
+
+class Selection:
+    """Chosen features for one capacity bucket, with how good the choice is known to be"""
+
+    __slots__ = ("selected", "value", "effort", "capacity", "candidates", "method", "bound")
+
+    def __init__(self, selected, value, effort, capacity, candidates, method, bound):
+        self.selected = selected  # feature ids, highest RICE first
+        self.value = value  # total RICE score
+        self.effort = effort  # effort points used
+        self.capacity = capacity
+        self.candidates = candidates
+        self.method = method  # "optimal" or "greedy"
+        self.bound = bound  # upper bound on the best achievable value
+
+    @property
+    def gap(self):
+        """Worst-case shortfall from the optimum, as a fraction (0 when proven optimal)"""
+        return 0.0 if not self.bound else max(0.0, 1 - self.value / self.bound)
+
+
+def _knapsack_dp(weights, values, capacity):
+    """Exact 0/1 knapsack over integer weights, one vectorized pass per item"""
+    best = np.zeros(capacity + 1)  # best[c] = max value with effort <= c
+    take = np.zeros((len(weights), capacity + 1), dtype=bool)
+    for i, (weight, value) in enumerate(zip(weights, values)):
+        if weight > capacity:
+            continue
+        candidate = best[:capacity + 1 - weight] + value
+        improved = candidate > best[weight:]
+        take[i, weight:] = improved
+        best[weight:] = np.where(improved, candidate, best[weight:])
+
+    chosen = []
+    remaining = capacity
+    for i in range(len(weights) - 1, -1, -1):
+        if take[i, remaining]:
+            chosen.append(i)
+            remaining -= weights[i]
+    return chosen
+
+
+def _knapsack_greedy(weights, values, capacity):
+    """Density-ordered fill plus the LP-relaxation upper bound"""
+    order = sorted(range(len(weights)), key=lambda i: values[i] / weights[i], reverse=True)
+
+    bound = 0.0
+    room = capacity
+    for i in order:
+        if weights[i] <= room:
+            bound += values[i]
+            room -= weights[i]
+        else:
+            bound += values[i] * room / weights[i]
+            break
+
+    chosen = []
+    room = capacity
+    for i in order:
+        if weights[i] <= room:
+            chosen.append(i)
+            room -= weights[i]
+
+    # The best single item alone keeps the greedy answer within half of the optimum
+    fitting = [i for i in range(len(weights)) if weights[i] <= capacity]
+    if fitting:
+        top = max(fitting, key=lambda i: values[i])
+        if values[top] > sum(values[i] for i in chosen):
+            chosen = [top]
+    return chosen, bound
+
+
+def select_features(features, capacity, max_cells=MAX_DP_CELLS):
+    """Highest total RICE subset of features whose effort points fit in capacity"""
+    candidates = [feature for feature in features if feature.get('rice_score', 0) > 0]
+    weights = [EFFORT_POINTS.get(feature.get('effort', DEFAULT_EFFORT), EFFORT_POINTS[DEFAULT_EFFORT])
+               for feature in candidates]
+    values = [float(feature['rice_score']) for feature in candidates]
+    capacity = max(0, int(capacity))
+
+    total_effort = sum(weights)
+    if total_effort <= capacity:
+        chosen, method = list(range(len(candidates))), "optimal"
+        bound = sum(values)
+    elif len(candidates) * (capacity + 1) <= max_cells:
+        chosen, method = _knapsack_dp(weights, values, capacity), "optimal"
+        bound = None
+    else:
+        chosen, bound = _knapsack_greedy(weights, values, capacity)
+        method = "greedy"
+
+    chosen.sort(key=lambda i: values[i], reverse=True)
+    value = round(sum(values[i] for i in chosen), 2)
+    return Selection(
+        selected=[candidates[i]['id'] for i in chosen],
+        value=value,
+        effort=sum(weights[i] for i in chosen),
+        capacity=capacity,
+        candidates=len(candidates),
+        method=method,
+        bound=value if bound is None else round(bound, 2),
+    )
+
+
+def plan_portfolio(features, capacity=None, default_capacity=DEFAULT_CAPACITY, max_cells=MAX_DP_CELLS):
+    """{(bu, year, quarter): Selection} - one knapsack per BU and planned quarter.
+
+    capacity maps a BU to the effort points it can deliver per quarter;
+    BUs not listed get default_capacity. Rejected features are never picked.
+    """
+    capacity = capacity or {}
+    buckets = {}
+    for feature in features:
+        if feature.get('status') in EXCLUDED_STATUSES:
+            continue
+        key = (feature.get('bu'), feature.get('year'), feature.get('quarter'))
+        buckets.setdefault(key, []).append(feature)
+    return {key: select_features(bucket, capacity.get(key[0], default_capacity), max_cells=max_cells)
+            for key, bucket in sorted(buckets.items(), key=lambda item: tuple(str(part) for part in item[0]))}
@@ -0,0 +1,257 @@
+import heapq
+import re
+import threading
+
+ID_PATTERN = re.compile(r"^F-(\d+)$")
+MATERIALIZE_BATCH = 10_000  # snapshot rows turned into dicts at a time while iterating
+
+
+def format_feature_id(seq):
+    return f"F-{seq:04d}"
+
+
+def feature_seq(feature_id):
+    """Numeric part of an 'F-0001' style id, or 0 for ids that don't follow the pattern"""
+    match = ID_PATTERN.match(feature_id or "")
+    return int(match.group(1)) if match else 0
+
+
+class FeatureRegistry:
+    """Ordered feature collection with constant-time lookup, update and delete by id.
+
+    Iteration yields features in insertion order, so it can be used anywhere
+    the old list of dicts was iterated.
+
+    Secondary indexes can be attached with attach(); they must provide
+    add(feature), remove(feature) and clear(), and are kept in sync with
+    every write. Records are replaced rather than mutated in place so that
+    indexes always see the old and new values. The exception is derived
+    fields such as scores, written with patch_many(); indexes that care
+    about those may provide patch(features, fields).
+
+    Every record carries a 'version' that starts at 1 and is bumped on each
+    update, so caches can tell which features changed. The registry's own
+    'version' moves on any change to the collection.
+
+    It can also start from a FeatureSnapshot: records then stay rows of
+    the mapped snapshot until something reads them, and indexes that
+    provide load_rows(snapshot, rows) load those rows from its columns
+    instead of from one dict per feature.
+    """
+
+    def __init__(self, features=(), id_source=None, snapshot=None):
+        self._records = {}  # id -> feature, or its snapshot row until first read; dicts keep insertion order
+        self._next_seq = 1
+        self._id_source = id_source
+        self._indexes = []
+        self._snapshot = snapshot
+        self._unread = 0  # records still held as snapshot rows
+        self._materialize_lock = threading.Lock()
+        self.version = 0
+        if snapshot is not None:
+            self._records = dict(zip(snapshot.ids(), range(len(snapshot))))
+            self._unread = len(self._records)
+            self._next_seq = snapshot.last_seq + 1
+            self.version += 1
+        for feature in features:
+            self._insert(feature)
+
+    def _insert(self, feature):
+        feature.setdefault('version', 1)
+        self._records[feature['id']] = feature
+        self._next_seq = max(self._next_seq, feature_seq(feature['id']) + 1)
+        self.version += 1
+        for index in self._indexes:
+            index.add(feature)
+
+    def attach(self, index):
+        """Register a secondary index and load the current records into it"""
+        index.clear()
+        if self._unread and self._unread == len(self._snapshot) == len(self._records) and hasattr(index, 'load_rows'):
+            # Nothing read or changed since the snapshot was mapped: load it whole
+            index.load_rows(self._snapshot, None)
+            features = ()
+        elif self._unread and hasattr(index, 'load_rows'):
+            rows = []
+            features = []
+            for record in self._records.values():
+                if type(record) is int:
+                    rows.append(record)
+                else:
+                    features.append(record)
+            index.load_rows(self._snapshot, rows)
+        else:
+            features = self
+        for feature in features:
+            index.add(feature)
+        self._indexes.append(index)
+        return index
+
+    def _materialize(self, feature_ids):
+        """Turn records that are still snapshot rows into feature dicts"""
+        with self._materialize_lock:
+            pending = [(feature_id, self._records.get(feature_id)) for feature_id in feature_ids]
+            pending = [(feature_id, row) for feature_id, row in pending if type(row) is int]
+            if not pending:
+                return
+            for (feature_id, _), feature in zip(pending, self._snapshot.rows(row for _, row in pending)):
+                feature.setdefault('version', 1)
+                self._records[feature_id] = feature
+            self._unread -= len(pending)
+
+    # Read access
+    def __iter__(self):
+        # Iterate a snapshot so a concurrent save can't break a loop midway
+        if not self._unread:
+            return iter(list(self._records.values()))
+        return self._iter_materializing(list(self._records))
+
+    def _iter_materializing(self, feature_ids):
+        for start in range(0, len(feature_ids), MATERIALIZE_BATCH):
+            batch = feature_ids[start:start + MATERIALIZE_BATCH]
+            self._materialize(batch)
+            for feature_id in batch:
+                feature = self._records.get(feature_id)
+                if feature is not None:
+                    yield feature
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, feature_id):
+        return feature_id in self._records
+
+    def get(self, feature_id):
+        record = self._records.get(feature_id)
+        if type(record) is int:
+            self._materialize([feature_id])
+            record = self._records.get(feature_id)
+        return record
+
+    def ids(self):
+        return list(self._records)
+
+    def newest(self, count, field='created_date'):
+        """The count features with the highest field (e.g. most recently created), highest first.
+
+        Records still held as snapshot rows are compared on that one column
+        and only the winners are materialized.
+        """
+        records = list(self._records.items())
+        column = self._snapshot.column(field) if self._unread else None
+
+        def value(item):
+            record = item[1]
+            return (column[record] if type(record) is int else record.get(field)) or ''
+
+        return [feature for feature in map(self.get, (feature_id for feature_id, _ in
+                                                       heapq.nlargest(count, records, key=value))) if feature]
+
+    # Writes
+    def allocate_id(self):
+        """Hand out a fresh id; never reuses ids of deleted features"""
+        if self._id_source is not None:
+            feature_id = self._id_source()
+        else:
+            feature_id = format_feature_id(self._next_seq)
+        self._next_seq = max(self._next_seq, feature_seq(feature_id)) + 1
+        return feature_id
+
+    def add(self, feature):
+        """Insert a new feature, allocating an id if it has none"""
+        if not feature.get('id'):
+            feature['id'] = self.allocate_id()
+        if feature['id'] in self._records:
+            raise KeyError(f"Feature {feature['id']} already exists")
+        self._insert(feature)
+        return feature
+
+    def update(self, feature):
+        """Replace an existing feature in place, keeping its position"""
+        old = self.get(feature['id'])
+        if old is None:
+            raise KeyError(f"Feature {feature['id']} not found")
+        feature['version'] = old.get('version', 1) + 1
+        self._records[feature['id']] = feature
+        self.version += 1
+        for index in self._indexes:
+            index.remove(old)
+            index.add(feature)
+        return feature
+
+    def remove(self, feature_id):
+        """Delete a feature by id; returns the removed record or None"""
+        self.get(feature_id)  # indexes need the whole record to retract it
+        old = self._records.pop(feature_id, None)
+        if old is not None:
+            self.version += 1
+            for index in self._indexes:
+                index.remove(old)
+        return old
+
+    def patch_many(self, updates):
+        """Write derived fields ({id: {field: value}}, e.g. scores) in place.
+
+        Record versions are left alone since nothing a user edited changed.
+        Returns the patched features.
+        """
+        patched = []
+        fields = set()
+        for feature_id, values in updates.items():
+            feature = self.get(feature_id)
+            if feature is not None:
+                feature.update(values)
+                patched.append(feature)
+                fields.update(values)
+        if patched:
+            self.version += 1
+            for index in self._indexes:
+                if hasattr(index, 'patch'):
+                    index.patch(patched, fields)
+        return patched
+
+    def replace_all(self, features):
+        self._records = {}
+        self._snapshot = None
+        self._unread = 0
+        self.version += 1
+        for index in self._indexes:
+            index.clear()
+        for feature in features:
+            self._insert(feature)
+
+
+class RowBacklog:
+    """Snapshot rows handed to an index by load_rows() that it has not loaded yet.
+
+    For indexes that are costly to build and not needed to render the
+    first page: keep one of these, discard() every id later seen through
+    add()/remove() (that record has moved on from its snapshot row), and
+    drain() it on the first query, under the lock that guards other lazy
+    reads. fields names what the index reads; None means whole, shared
+    records, for indexes that keep the dicts.
+    """
+
+    def __init__(self, snapshot, rows, fields=None):
+        self.snapshot = snapshot
+        self.rows = rows  # None means every row
+        self.fields = fields
+        self.seen = set()
+
+    def discard(self, feature_id):
+        self.seen.add(feature_id)
+
+    def records(self):
+        """The rows whose record hasn't been seen since, as records, lazily"""
+        if self.fields is None:
+            rows = range(len(self.snapshot)) if self.rows is None else self.rows
+            features = (feature for start in range(0, len(rows), MATERIALIZE_BATCH)
+                        for feature in self.snapshot.rows(rows[start:start + MATERIALIZE_BATCH]))
+        else:
+            features = self.snapshot.records(self.fields, self.rows)
+        return (feature for feature in features if feature['id'] not in self.seen)
+
+    def drain(self, add):
+        """Feed every row whose record hasn't been seen since to add()"""
+        for feature in self.records():
+            add(feature)
@@ -0,0 +1,263 @@
+import heapq
+from collections import Counter, OrderedDict
+
+from optimizer import DEFAULT_CAPACITY, EXCLUDED_STATUSES
+from registry import RowBacklog, feature_seq
+from scoring import DEFAULT_EFFORT, EFFORT_POINTS
+
+QUARTERS = ("Q1", "Q2", "Q3", "Q4")
+SPILL_YEARS = 1  # how far past the latest planned year features may be pushed
+MAX_PLANS = 8  # capacity settings whose plans are kept at once
+
+
+def to_slot(year, quarter):
+    """(2025, 'Q3') -> one integer per quarter, so slots can be compared and stepped"""
+    return int(year) * 4 + QUARTERS.index(quarter)
+
+
+def from_slot(slot):
+    return slot // 4, QUARTERS[slot % 4]
+
+
+def feature_demand(feature):
+    """{team: effort points} a feature needs in the quarter it lands in.
+
+    The owning BU builds it (its effort points); every dependency entry
+    asks the same effort of the dependent team, as on the load heatmap.
+    """
+    points = EFFORT_POINTS.get(feature.get('effort', DEFAULT_EFFORT), EFFORT_POINTS[DEFAULT_EFFORT])
+    demand = Counter({feature.get('bu'): points})
+    for dep in feature.get('dependency_details') or []:
+        if dep.get('team'):
+            demand[dep['team']] += points
+    return demand
+
+
+class _Plan:
+    """Placements under one set of team capacities, kept up to date incrementally"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.placed = {}  # id -> (slot or None, demand)
+        self.load = Counter()  # (team, slot) -> effort points
+        self.dirty = set()
+        self.full = True
+        self.version = 0  # which recompute produced the current placements
+
+
+class QuarterScheduler:
+    """Proposes a quarter for every feature within team capacities and blocker order.
+
+    List scheduling: features are placed in dependency order (ties: earlier
+    entered quarter, then higher RICE), each into the slot nearest its
+    hand-entered quarter - never earlier than that year, and strictly after
+    every feature blocking it - where the owner and all dependent teams
+    still have room. Features that fit nowhere in the horizon stay
+    unscheduled, as does anything waiting on them.
+
+    Attach it to a FeatureRegistry after the FeatureLinks index it reads
+    blockers from. Edits are re-planned incrementally: only the changed
+    features and the features waiting on them are taken out and placed
+    again against everyone else's load, so the rest of the plan stays put.
+    replan() starts over from scratch. Rows loaded from a snapshot are
+    read (as whole features) on the first plan.
+
+    Reads take the caller's capacities ({team: points}, None for the
+    defaults), so sessions planning with different numbers don't overwrite
+    each other: one plan is kept per capacity setting, up to max_plans.
+    plan_version() moves whenever a plan's placements are recomputed.
+    """
+
+    def __init__(self, links, capacity=None, default_capacity=DEFAULT_CAPACITY, max_plans=MAX_PLANS):
+        self.links = links
+        self.capacity = dict(capacity or {})
+        self.default_capacity = default_capacity
+        self.max_plans = max_plans
+        self._recomputes = 0
+        self.clear()
+
+    # Registry index protocol
+    def add(self, feature):
+        if self._backlog:
+            self._backlog.discard(feature['id'])
+        self._features[feature['id']] = feature
+        for plan in self._plans.values():
+            plan.dirty.add(feature['id'])
+
+    def remove(self, feature):
+        if self._backlog:
+            self._backlog.discard(feature['id'])
+        self._features.pop(feature['id'], None)
+        for plan in self._plans.values():
+            plan.dirty.add(feature['id'])
+
+    def load_rows(self, snapshot, rows):
+        self._backlog = RowBacklog(snapshot, rows)
+        for plan in self._plans.values():
+            plan.full = True
+
+    def clear(self):
+        self._backlog = None  # snapshot rows not read yet
+        self._features = {}  # id -> feature
+        self._plans = OrderedDict()  # capacity key -> _Plan, least recently used first
+
+    # Configuration
+    def _plan(self, capacity):
+        capacity = dict(self.capacity if capacity is None else capacity)
+        key = tuple(sorted(capacity.items()))
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._plans[key] = _Plan(capacity)
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+        self._plans.move_to_end(key)
+        return plan
+
+    def team_capacity(self, team, capacity=None):
+        return (self.capacity if capacity is None else capacity).get(team, self.default_capacity)
+
+    def replan(self, capacity=None):
+        self._plan(capacity).full = True
+        return self.assignments(capacity)
+
+    def plan_version(self, capacity=None):
+        """Changes whenever the plan for these capacities is recomputed (edits, replan())"""
+        plan = self._plan(capacity)
+        self._refresh(plan)
+        return plan.version
+
+    # Planning
+    def _plannable(self, feature_id):
+        feature = self._features.get(feature_id)
+        return feature is not None and feature.get('status') not in EXCLUDED_STATUSES
+
+    def _preferred(self, feature):
+        try:
+            return to_slot(feature['year'], feature['quarter'])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _horizon(self):
+        years = [int(feature['year']) for feature in self._features.values() if feature.get('year')]
+        return (max(years) + SPILL_YEARS) * 4 + 3 if years else None
+
+    def _unplace(self, plan, feature_id):
+        slot, demand = plan.placed.pop(feature_id, (None, None))
+        if slot is not None:
+            for team, points in demand.items():
+                key = (team, slot)
+                plan.load[key] -= points
+                if plan.load[key] <= 0:
+                    del plan.load[key]
+
+    def _fits(self, plan, demand, slot):
+        return all(plan.load[(team, slot)] + points <= self.team_capacity(team, plan.capacity)
+                   for team, points in demand.items())
+
+    def _place(self, plan, feature_id, horizon):
+        feature = self._features[feature_id]
+        demand = feature_demand(feature)
+        preferred = self._preferred(feature)
+        slot = None
+        blocker_slots = [plan.placed[blocker][0] for blocker in self.links.blockers(feature_id)
+                         if blocker in plan.placed]
+        if preferred is not None and None not in blocker_slots:
+            earliest = max([preferred - preferred % 4] + [blocker_slot + 1 for blocker_slot in blocker_slots])
+            # Nearest slot to the entered quarter first; later wins a tie
+            for candidate in sorted(range(earliest, horizon + 1), key=lambda s: (abs(s - preferred), s < preferred)):
+                if self._fits(plan, demand, candidate):
+                    slot = candidate
+                    break
+        plan.placed[feature_id] = (slot, demand)
+        if slot is not None:
+            for team, points in demand.items():
+                plan.load[(team, slot)] += points
+
+    def _place_all(self, plan, feature_ids):
+        """Place a set of features, each after the ones in the set blocking it"""
+        horizon = self._horizon()
+        waiting = {}
+        ready = []
+        for feature_id in feature_ids:
+            pending = sum(1 for blocker in self.links.blockers(feature_id) if blocker in feature_ids)
+            if pending:
+                waiting[feature_id] = pending
+            else:
+                ready.append(self._priority(feature_id))
+        heapq.heapify(ready)
+        while ready:
+            feature_id = heapq.heappop(ready)[-1]
+            self._place(plan, feature_id, horizon)
+            for dependent in self.links.blocked(feature_id):
+                if dependent in waiting:
+                    waiting[dependent] -= 1
+                    if not waiting[dependent]:
+                        del waiting[dependent]
+                        heapq.heappush(ready, self._priority(dependent))
+        # Whatever is left waits on a cycle
+        for feature_id in waiting:
+            plan.placed[feature_id] = (None, feature_demand(self._features[feature_id]))
+
+    def _priority(self, feature_id):
+        feature = self._features[feature_id]
+        preferred = self._preferred(feature)
+        return (preferred is None, preferred or 0, -(feature.get('rice_score') or 0), feature_seq(feature_id), feature_id)
+
+    def _downstream(self, feature_ids):
+        seen = set(feature_ids)
+        stack = list(feature_ids)
+        while stack:
+            for dependent in self.links.blocked(stack.pop()):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    stack.append(dependent)
+        return seen
+
+    def _refresh(self, plan):
+        backlog, self._backlog = self._backlog, None
+        if backlog:
+            backlog.drain(self.add)
+            for other in self._plans.values():
+                other.full = True
+        if plan.full:
+            plan.placed = {}
+            plan.load = Counter()
+            affected = set(self._features)
+        elif plan.dirty:
+            affected = self._downstream(plan.dirty)
+            for feature_id in affected:
+                self._unplace(plan, feature_id)
+        else:
+            return plan
+        plan.full = False
+        plan.dirty = set()
+        self._place_all(plan, {feature_id for feature_id in affected if self._plannable(feature_id)})
+        self._recomputes += 1
+        plan.version = self._recomputes
+        return plan
+
+    # Reads (capacity: {team: points}, None for the scheduler's own)
+    def assignments(self, capacity=None):
+        """{feature id: (year, quarter) or None when it could not be scheduled}"""
+        plan = self._refresh(self._plan(capacity))
+        return {feature_id: None if slot is None else from_slot(slot)
+                for feature_id, (slot, _) in plan.placed.items()}
+
+    def moves(self, capacity=None):
+        """[(feature id, entered (year, quarter), proposed (year, quarter) or None)] where they differ"""
+        changed = []
+        for feature_id, proposed in self.assignments(capacity).items():
+            feature = self._features[feature_id]
+            entered = (feature.get('year'), feature.get('quarter'))
+            if proposed != entered:
+                changed.append((feature_id, entered, proposed))
+        return sorted(changed, key=lambda move: feature_seq(move[0]))
+
+    def load(self, team, year, quarter, capacity=None):
+        plan = self._refresh(self._plan(capacity))
+        return plan.load.get((team, to_slot(year, quarter)), 0)
+
+    def slots(self, capacity=None):
+        """(year, quarter) pairs that carry any load, in order"""
+        plan = self._refresh(self._plan(capacity))
+        return [from_slot(slot) for slot in sorted({slot for _, slot in plan.load})]
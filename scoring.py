@@ -0,0 +1,158 @@
+from collections import OrderedDict
+
+import numpy as np
+
+EFFORT_POINTS = {"XS": 1, "S": 2, "M": 3, "L": 5, "XL": 8}
+DEFAULT_EFFORT = "M"
+DEFAULT_IMPACT = 5
+DEFAULT_CONFIDENCE = 0.8
+
+
+class _CachedScores:
+    """Scores for one weight vector, plus the feature version each was computed from"""
+
+    def __init__(self):
+        self.scores = np.zeros(0, dtype=np.float64)
+        self.versions = np.zeros(0, dtype=np.int64)
+        self.mapping = None  # {feature_id: score}, dropped whenever a score changes
+
+    def fit(self, size):
+        if len(self.scores) < size:
+            scores = np.zeros(size, dtype=np.float64)
+            versions = np.full(size, -1, dtype=np.int64)
+            scores[:len(self.scores)] = self.scores
+            versions[:len(self.versions)] = self.versions
+            self.scores, self.versions = scores, versions
+
+
+class RiceScorer:
+    """Columnar, memoized RICE scoring engine.
+
+    Keeps impact, effort points, confidence and feature version for every
+    feature in NumPy arrays (one slot per feature) so scores for a weight
+    vector are computed in a single vectorized pass. Results are cached per
+    weight vector together with the feature versions they were computed
+    from, so asking again only rescores new or edited features. The least
+    recently used weight vectors are evicted beyond cache_size.
+
+    Attach it to a FeatureRegistry to keep it in sync.
+    """
+
+    def __init__(self, capacity=64, cache_size=32):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # weights tuple -> _CachedScores
+        self._ids = []  # slot -> feature id, None for free slots
+        self._slots = {}  # feature id -> slot
+        self._free = []
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._impact = np.zeros(capacity, dtype=np.float64)
+        self._effort = np.zeros(capacity, dtype=np.int64)
+        self._confidence = np.zeros(capacity, dtype=np.float64)
+        self._version = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _grow(self):
+        capacity = max(64, 2 * len(self._alive))
+        for name in ("_alive", "_impact", "_effort", "_confidence", "_version"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    # Registry index protocol
+    def add(self, feature):
+        if self._free:
+            slot = self._free.pop()
+            self._ids[slot] = feature['id']
+        else:
+            slot = len(self._ids)
+            if slot == len(self._alive):
+                self._grow()
+            self._ids.append(feature['id'])
+        self._slots[feature['id']] = slot
+        self._alive[slot] = True
+        self._impact[slot] = feature.get('impact', DEFAULT_IMPACT)
+        self._effort[slot] = EFFORT_POINTS.get(feature.get('effort', DEFAULT_EFFORT), EFFORT_POINTS[DEFAULT_EFFORT])
+        self._confidence[slot] = feature.get('confidence', DEFAULT_CONFIDENCE)
+        self._version[slot] = feature.get('version', 0)
+
+    def load_rows(self, snapshot, rows):
+        """Bulk-load snapshot rows into fresh slots, one column at a time"""
+        ids = snapshot.column('id', rows)
+        start = len(self._ids)
+        while start + len(ids) > len(self._alive):
+            self._grow()
+        slots = slice(start, start + len(ids))
+        self._ids.extend(ids)
+        self._slots.update(zip(ids, range(start, start + len(ids))))
+        self._alive[slots] = True
+        self._impact[slots] = snapshot.array('impact', DEFAULT_IMPACT, rows=rows)
+        self._effort[slots] = snapshot.array('effort', EFFORT_POINTS[DEFAULT_EFFORT], EFFORT_POINTS, rows=rows)
+        self._confidence[slots] = snapshot.array('confidence', DEFAULT_CONFIDENCE, rows=rows)
+        self._version[slots] = snapshot.array('version', 1, rows=rows)
+
+    def remove(self, feature):
+        slot = self._slots.pop(feature['id'], None)
+        if slot is None:
+            return
+        self._ids[slot] = None
+        self._alive[slot] = False
+        self._free.append(slot)
+        # The slot may be reused by another feature with the same version number
+        for cached in self._cache.values():
+            if slot < len(cached.versions):
+                cached.versions[slot] = -1
+            cached.mapping = None
+
+    def clear(self):
+        self._cache.clear()
+        self._ids = []
+        self._slots = {}
+        self._free = []
+        self._alive[:] = False
+
+    # Scoring
+    def _compute(self, slots, weights):
+        reach_weight, impact_weight, confidence_weight, effort_weight = weights
+        impact = self._impact[slots]
+        reach = impact * 1000
+        numerator = (reach * reach_weight +
+                     (impact / 2.5) * impact_weight * 100 +
+                     self._confidence[slots] * confidence_weight * 100)
+        if effort_weight > 0:
+            numerator /= self._effort[slots] * effort_weight
+        return np.round(numerator, 2)
+
+    def _refresh(self, weights):
+        """Cached scores for a weight vector, recomputed for stale slots only"""
+        cached = self._cache.get(weights)
+        if cached is None:
+            cached = self._cache[weights] = _CachedScores()
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(weights)
+
+        size = len(self._ids)
+        cached.fit(size)
+        stale = np.flatnonzero(self._alive[:size] & (cached.versions[:size] != self._version[:size]))
+        if len(stale):
+            cached.scores[stale] = self._compute(stale, weights)
+            cached.versions[stale] = self._version[stale]
+            cached.mapping = None
+        return cached
+
+    def score_map(self, reach_weight, impact_weight, confidence_weight, effort_weight):
+        """RICE scores as a {feature_id: score} dict, rounded to 2 decimals.
+
+        A zero effort weight means effort is left out of the score rather
+        than dividing by zero.
+        """
+        weights = (float(reach_weight), float(impact_weight), float(confidence_weight), float(effort_weight))
+        cached = self._refresh(weights)
+        if cached.mapping is None:
+            alive = np.flatnonzero(self._alive[:len(self._ids)])
+            cached.mapping = dict(zip((self._ids[slot] for slot in alive), cached.scores[alive].tolist()))
+        return cached.mapping
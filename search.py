@@ -0,0 +1,290 @@
+import bisect
+import heapq
+import itertools
+import math
+import re
+from collections import Counter
+from operator import add, itemgetter
+
+from registry import RowBacklog
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+TITLE_BOOST = 2  # title tokens count this many times towards term frequency
+PASSAGE_WEIGHT = 0.5  # a feature's best PRD passage match adds this share of its score
+SEARCH_FIELDS = ("title", "description", "dependency_details", "prd_sha256")
+GROUP_MIN_DF = 256  # terms in at least this many documents keep their postings grouped by (tf, length)
+WARM_BATCH = 500  # snapshot rows tokenized per batch by warm(); the lock is held only to add one batch
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+def feature_terms(feature):
+    """Term frequencies for a feature's title, description and dependency details"""
+    terms = Counter()
+    for token in tokenize(feature.get('title')):
+        terms[token] += TITLE_BOOST
+    terms.update(tokenize(feature.get('description')))
+    for dep in feature.get('dependency_details') or []:
+        terms.update(tokenize(dep.get('title')))
+        terms.update(tokenize(dep.get('description')))
+    return terms
+
+
+def passage_terms(passages):
+    """Term frequencies per passage, for add_passages(); needs no lock, so it's done before taking one"""
+    return [Counter(tokenize(passage)) for passage in passages]
+
+
+class SearchIndex:
+    """In-memory inverted index with BM25 ranking and prefix matching.
+
+    Attach it to a FeatureRegistry to keep it updated on save/delete.
+    Every query term also matches the vocabulary terms it is a prefix of,
+    found by bisecting a sorted vocabulary, so partially typed words
+    already find results; past max_expansions, only the most frequent
+    completions (and the word itself) are kept.
+
+    A term's BM25 score for a document depends only on its tf and the
+    document's length, so the postings of common terms (group_min_df or
+    more documents) are kept as {(tf, length): {doc ids}}. A query scores
+    each group once and hands its score to the whole set, instead of
+    scoring tens of thousands of documents one by one.
+
+    Text extracted from PRDs arrives later through add_passages(), keyed
+    by the file's hash and already tokenized by passage_terms(). Each passage is a document of its own, id
+    (feature id, n), so a long PRD doesn't drown out short titles, and a
+    feature is credited with its best passage match.
+    """
+
+    def __init__(self, k1=1.2, b=0.75, min_prefix=2, max_expansions=20, passage_weight=PASSAGE_WEIGHT,
+                 group_min_df=GROUP_MIN_DF):
+        self.k1 = k1
+        self.b = b
+        self.min_prefix = min_prefix
+        self.max_expansions = max_expansions
+        self.group_min_df = group_min_df
+        self.passage_weight = passage_weight
+        self._passages = {}  # PRD digest -> [Counter of terms] per passage; kept across clear()
+        self.clear()
+
+    # Registry index protocol
+    def add(self, feature, terms=None):
+        if self._backlog:
+            self._backlog.discard(feature['id'])
+        self.add_document(feature['id'], feature_terms(feature) if terms is None else terms)
+        digest = feature.get('prd_sha256')
+        if digest:
+            self._feature_digests[feature['id']] = digest
+            self._add_feature_passages(feature['id'], digest)
+
+    def remove(self, feature):
+        if self._backlog:
+            self._backlog.discard(feature['id'])
+        self.remove_document(feature['id'])
+        digest = self._feature_digests.pop(feature['id'], None)
+        if digest:
+            self._remove_feature_passages(feature['id'], digest)
+
+    def load_rows(self, snapshot, rows):
+        self._backlog = RowBacklog(snapshot, rows, SEARCH_FIELDS)
+
+    def _load_backlog(self):
+        backlog, self._backlog = self._backlog, None
+        if backlog:
+            backlog.drain(self.add)
+
+    def warm(self, lock, batch=WARM_BATCH):
+        """Load the snapshot backlog ahead of the first query, from a background thread.
+
+        Rows are tokenized without holding lock (snapshot rows never
+        change); lock is taken per batch only to add them, so writers and
+        readers get in between. A query arriving first drains the rest itself.
+        """
+        backlog = self._backlog
+        if not backlog:
+            return
+        records = backlog.records()
+        while True:
+            prepared = [(feature, feature_terms(feature)) for feature in itertools.islice(records, batch)]
+            with lock:
+                if self._backlog is not backlog:
+                    return  # drained by a query, or dropped by clear()
+                for feature, terms in prepared:
+                    if feature['id'] not in backlog.seen:  # saved or deleted since it was read
+                        self.add(feature, terms)
+                if not prepared:
+                    self._backlog = None
+                    return
+
+    def clear(self):
+        self._backlog = None  # snapshot rows not tokenized yet
+        self._postings = {}  # term -> {doc_id: tf}, for terms in fewer than group_min_df documents
+        self._groups = {}  # term -> {(tf, length): {doc_ids}}, for the others
+        self._df = {}  # term -> number of documents containing it
+        self._docs = {}  # doc_id -> Counter of terms
+        self._lengths = {}  # doc_id -> number of tokens
+        self._vocab = []  # sorted terms, for prefix lookups
+        self._total_length = 0
+        self._feature_digests = {}  # feature id -> its PRD digest
+        self._passage_docs = 0
+
+    # PRD passages
+    def add_passages(self, digest, passages):
+        """Index a PRD's passages (as passage_terms()) for every feature (now or later) pointing at that file"""
+        features = [feature_id for feature_id, feature_digest in self._feature_digests.items()
+                    if feature_digest == digest]
+        for feature_id in features:
+            self._remove_feature_passages(feature_id, digest)
+        self._passages[digest] = passages
+        for feature_id in features:
+            self._add_feature_passages(feature_id, digest)
+
+    def _add_feature_passages(self, feature_id, digest):
+        for number, terms in enumerate(self._passages.get(digest, ())):
+            self.add_document((feature_id, number), terms)
+            self._passage_docs += 1
+
+    def _remove_feature_passages(self, feature_id, digest):
+        for number in range(len(self._passages.get(digest, ()))):
+            if (feature_id, number) in self._docs:
+                self.remove_document((feature_id, number))
+                self._passage_docs -= 1
+
+    # Documents
+    def add_document(self, doc_id, terms):
+        if doc_id in self._docs:
+            self.remove_document(doc_id)
+        self._docs[doc_id] = terms
+        length = self._lengths[doc_id] = sum(terms.values())
+        self._total_length += length
+        for term, tf in terms.items():
+            df = self._df.get(term, 0)
+            self._df[term] = df + 1
+            groups = self._groups.get(term)
+            if groups is not None:
+                groups.setdefault((tf, length), set()).add(doc_id)
+                continue
+            if not df:
+                self._postings[term] = {}
+                bisect.insort(self._vocab, term)
+            self._postings[term][doc_id] = tf
+            if df + 1 >= self.group_min_df:
+                self._group(term)
+
+    def remove_document(self, doc_id):
+        terms = self._docs.pop(doc_id, None)
+        if terms is None:
+            return
+        length = self._lengths.pop(doc_id)
+        self._total_length -= length
+        for term, tf in terms.items():
+            df = self._df[term] - 1
+            groups = self._groups.get(term)
+            if groups is not None:
+                docs = groups[tf, length]
+                docs.discard(doc_id)
+                if not docs:
+                    del groups[tf, length]
+                if df < self.group_min_df // 2:  # not at group_min_df, so a term on the edge doesn't flip back and forth
+                    self._ungroup(term)
+            else:
+                del self._postings[term][doc_id]
+            if df:
+                self._df[term] = df
+            else:
+                del self._df[term]
+                self._postings.pop(term, None)
+                self._groups.pop(term, None)
+                del self._vocab[bisect.bisect_left(self._vocab, term)]
+
+    def _group(self, term):
+        groups = self._groups[term] = {}
+        for doc_id, tf in self._postings.pop(term).items():
+            groups.setdefault((tf, self._lengths[doc_id]), set()).add(doc_id)
+
+    def _ungroup(self, term):
+        self._postings[term] = {doc_id: tf for (tf, _), docs in self._groups.pop(term).items() for doc_id in docs}
+
+    def __len__(self):
+        self._load_backlog()
+        return len(self._docs) - self._passage_docs
+
+    # Queries
+    def _expand(self, token):
+        """The token itself plus the (at most max_expansions most frequent) vocabulary terms it is a prefix of"""
+        if len(token) < self.min_prefix:
+            return [token] if token in self._df else []
+        start = bisect.bisect_left(self._vocab, token)
+        end = bisect.bisect_left(self._vocab, token[:-1] + chr(ord(token[-1]) + 1), start)
+        expansions = self._vocab[start:end]
+        if len(expansions) > self.max_expansions:
+            # Rare completions cost as much to check as they add; keep the common ones and the word as typed
+            expansions = heapq.nlargest(self.max_expansions, expansions, key=self._df.__getitem__)
+            if token in self._df and token not in expansions:
+                expansions[-1] = token
+        return expansions
+
+    def _token_scores(self, token, n_docs, avg_length):
+        """{doc_id: score} for one query token, through each document's best-matching expansion"""
+        k1, b = self.k1, self.b
+        # k1 * (1 - b + b * length / avg_length) as norm_base + norm_scale * length
+        norm_base, norm_scale = k1 * (1 - b), k1 * b / avg_length if avg_length else 0
+        grouped = []
+        single = []
+        for term in self._expand(token):
+            df = self._df[term]
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            groups = self._groups.get(term)
+            if groups is None:
+                single.append((idf, self._postings[term]))
+            else:
+                grouped.extend((idf * tf * (k1 + 1) / (tf + norm_base + norm_scale * length), docs)
+                               for (tf, length), docs in groups.items())
+
+        # Best groups first, so a document's first score is its best one
+        best = {}
+        for score, docs in sorted(grouped, key=itemgetter(0), reverse=True):
+            best.update(dict.fromkeys(docs.difference(best) if best else docs, score))
+        lengths = self._lengths
+        for idf, postings in single:
+            for doc_id, tf in postings.items():
+                score = idf * tf * (k1 + 1) / (tf + norm_base + norm_scale * lengths[doc_id])
+                if score > best.get(doc_id, 0):
+                    best[doc_id] = score
+        return best
+
+    def search(self, query, limit=None):
+        """[(feature id, score)] best first; features match any query term"""
+        self._load_backlog()
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self._docs:
+            return []
+        n_docs = len(self._docs)
+        avg_length = self._total_length / n_docs
+
+        scores = {}
+        for token in tokens:
+            best = self._token_scores(token, n_docs, avg_length)
+            if not scores:
+                scores = best
+                continue
+            # Summed with map/zip rather than a Python loop: both can hold most of the index
+            both = scores.keys() & best.keys()
+            scores.update(zip(both, map(add, map(scores.__getitem__, both), map(best.__getitem__, both))))
+            new = best.keys() - scores.keys()
+            scores.update(zip(new, map(best.__getitem__, new)))
+
+        # Passages score for their feature: its own text plus a share of its best passage
+        passage_scores = {}
+        for doc_id in [doc_id for doc_id in scores if type(doc_id) is tuple] if self._passage_docs else ():
+            score = scores.pop(doc_id)
+            if score > passage_scores.get(doc_id[0], 0):
+                passage_scores[doc_id[0]] = score
+        for feature_id, score in passage_scores.items():
+            scores[feature_id] = scores.get(feature_id, 0) + self.passage_weight * score
+
+        if limit is None:
+            return sorted(scores.items(), key=itemgetter(1), reverse=True)
+        return heapq.nlargest(limit, scores.items(), key=itemgetter(1))
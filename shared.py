@@ -0,0 +1,189 @@
+import os
+import threading
+from contextlib import ExitStack
+
+from extraction import PrdExtractor, TextCache
+from facets import FacetIndex
+from frame import FeatureFrame
+from graph import DependencyGraph
+from ledger import VoteLedger, decide_status
+from links import FeatureLinks
+from registry import FeatureRegistry
+from scheduler import QuarterScheduler
+from scoring import RiceScorer
+from search import SearchIndex, passage_terms
+
+RECORD_LOCK_STRIPES = 64  # per-feature check-and-write locks, shared by ids that hash alike
+
+
+class ConflictError(Exception):
+    """A feature changed (or was deleted) after the caller read it"""
+
+    def __init__(self, feature_id, expected_version, current_version):
+        self.feature_id = feature_id
+        self.expected_version = expected_version
+        self.current_version = current_version  # None when the feature is gone
+        if current_version is None:
+            message = f"Feature {feature_id} was deleted by someone else"
+        else:
+            message = (f"Feature {feature_id} was changed by someone else "
+                       f"(you loaded version {expected_version}, it is now at version {current_version})")
+        super().__init__(message)
+
+
+class DependencyCycleError(ValueError):
+    """Saving a feature would make it (indirectly) wait on itself"""
+
+    def __init__(self, cycle):
+        self.cycle = cycle
+        super().__init__(f"These dependencies would create a cycle: {' → '.join(cycle)}")
+
+
+class SharedPortfolio:
+    """Process-wide portfolio: one registry, its indexes and the vote ledger for every session.
+
+    Writes are optimistic: callers pass the record version they read and a
+    stale version raises ConflictError instead of overwriting someone
+    else's change. The check-and-write holds one of RECORD_LOCK_STRIPES
+    locks picked by feature id, so reviewers working on different features
+    rarely wait on each other.
+    `lock` guards the registry and its in-memory indexes; it is held only
+    for the in-memory update (never for SQLite I/O), and readers take it
+    around index reads that refresh lazily (frame, ordering, schedule, search).
+    Given an AttachmentStore, PRD text is extracted in the background and
+    added to the search index. A search index started from a snapshot is
+    also built in the background, so the first search doesn't pay for it.
+    """
+
+    def __init__(self, store, attachments=None):
+        self.store = store
+        self.lock = threading.RLock()
+        self._record_locks = [threading.Lock() for _ in range(RECORD_LOCK_STRIPES)]
+
+        # Read the stamp first: anything written meanwhile makes the snapshot look stale, never current
+        stamp = store.feature_stamp()
+        snapshot = store.load_snapshot(stamp)
+        if snapshot is not None:
+            self.features = FeatureRegistry(snapshot=snapshot, id_source=store.allocate_feature_id)
+        else:
+            features = store.load_features()
+            self.features = FeatureRegistry(features, id_source=store.allocate_feature_id)
+            # Next start maps this instead of parsing JSON, unless something is written first
+            threading.Thread(target=store.save_snapshot, args=(features, stamp), daemon=True).start()
+        self.rice_scorer = self.features.attach(RiceScorer())
+        self.facets = self.features.attach(FacetIndex())
+        self.search_index = self.features.attach(SearchIndex())
+        self.feature_frame = self.features.attach(FeatureFrame())
+        self.dependency_graph = self.features.attach(DependencyGraph())
+        self.feature_links = self.features.attach(FeatureLinks())
+        self.quarter_scheduler = self.features.attach(QuarterScheduler(self.feature_links))
+        self.prd_extractor = None
+        if attachments is not None:
+            text_cache = TextCache(os.path.join(attachments.root, "text"))
+            self.prd_extractor = self.features.attach(
+                PrdExtractor(attachments, text_cache, self.search_index.add_passages, self.lock, prepare=passage_terms))
+        self.votes = VoteLedger(store.load_vote_ledger())
+        # Tokenizing a snapshot's rows takes seconds at 100k features: do it now rather than on the first search
+        threading.Thread(target=self.search_index.warm, args=(self.lock,), daemon=True, name="search-warm").start()
+
+    def record_lock(self, feature_id):
+        """The lock striped over feature_id (a fixed set, so deleted ids leave nothing behind)"""
+        return self._record_locks[hash(feature_id) % RECORD_LOCK_STRIPES]
+
+    def _check_version(self, feature_id, expected_version):
+        current = self.features.get(feature_id)
+        current_version = current.get('version') if current else None
+        if current is None or (expected_version is not None and current_version != expected_version):
+            raise ConflictError(feature_id, expected_version, current_version)
+        return current
+
+    def _check_cycle(self, feature):
+        blockers = {dep['feature_id'] for dep in feature.get('dependency_details') or [] if dep.get('feature_id')}
+        cycle = self.feature_links.find_cycle(feature.get('id'), blockers)
+        if cycle:
+            raise DependencyCycleError(cycle)
+
+    def change_counter(self):
+        """Moves whenever any feature or vote changes; cheap enough to poll"""
+        return self.features.version + self.votes.version
+
+    # Features
+    def save_feature(self, feature, expected_version=None):
+        """Add a new feature (no id) or replace one, if it is still at expected_version"""
+        if not feature.get('id'):
+            feature['id'] = self.features.allocate_id()
+            with self.lock:
+                self.features.add(feature)
+            self.store.save_feature(feature)
+            return feature
+        with self.record_lock(feature['id']):
+            with self.lock:
+                self._check_version(feature['id'], expected_version)
+                self._check_cycle(feature)
+                self.features.update(feature)
+            self.store.save_feature(feature)
+        return feature
+
+    def add_features(self, features):
+        """Add a batch of new features: one id reservation, one index update, one transaction"""
+        if not features:
+            return features
+        for feature, feature_id in zip(features, self.store.allocate_feature_ids(len(features))):
+            feature['id'] = feature_id
+        with self.lock:
+            for feature in features:
+                self.features.add(feature)
+        self.store.save_features(features)
+        return features
+
+    def delete_feature(self, feature_id, expected_version=None):
+        with self.record_lock(feature_id):
+            with self.lock:
+                self._check_version(feature_id, expected_version)
+                self.features.remove(feature_id)
+            self.votes.forget(feature_id)
+            self.store.delete_feature(feature_id)
+
+    def patch_features(self, updates):
+        """Write derived fields ({id: {field: value}}) without version checks.
+
+        The record locks of every patched id are held across the in-memory
+        patch and the SQLite upsert, so a save or delete of one of them
+        can't land in between and be overwritten (or undone) by the stale
+        row. They are taken in stripe order, so two patches can't deadlock.
+        """
+        with ExitStack() as stack:
+            for stripe in sorted({hash(feature_id) % RECORD_LOCK_STRIPES for feature_id in updates}):
+                stack.enter_context(self._record_locks[stripe])
+            with self.lock:
+                patched = self.features.patch_many(updates)
+            self.store.save_features(patched)
+        return patched
+
+    def replace_all(self, features, clear_votes=False):
+        """Swap every feature; the vote history survives unless clear_votes"""
+        with self.lock:
+            self.features.replace_all(features)
+            if clear_votes:
+                self.votes.clear()
+        self.store.replace_all(features, clear_votes)
+
+    # Votes
+    def vote(self, feature_id, pm, vote):
+        """Record a PM's vote; moves the feature's status if decided.
+
+        Votes are ledger appends, so they are not checked against the
+        feature's version: the status change one vote causes must not turn
+        the next PM's vote from the same board into a conflict.
+        """
+        with self.record_lock(feature_id):
+            feature = self._check_version(feature_id, None)
+            entry = self.votes.record(feature_id, pm, vote)
+            status = decide_status(self.votes.tally(feature_id), feature.get('status'))
+            updated = None
+            if status != feature.get('status'):
+                # Replace rather than mutate so the registry's indexes see the change
+                with self.lock:
+                    updated = self.features.update(dict(feature, status=status))
+            self.store.append_vote(entry, updated)
+        return entry
@@ -0,0 +1,308 @@
+import json
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from registry import MATERIALIZE_BATCH, feature_seq
+
+FEATURES_FILE = "features.arrow"
+DEPENDENCIES_FILE = "dependencies.arrow"
+FORMAT_VERSION = "2"
+
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+FEATURE_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("title", pa.string()),
+    ("description", pa.string()),
+    ("bu", _CATEGORY),
+    ("year", pa.int32()),
+    ("half", _CATEGORY),
+    ("quarter", _CATEGORY),
+    ("type", _CATEGORY),
+    ("impact", pa.int32()),
+    ("effort", _CATEGORY),
+    ("dependent_teams", pa.list_(pa.string())),
+    ("prd_file", pa.string()),
+    ("prd_sha256", pa.string()),
+    ("mockup_file", pa.string()),
+    ("mockup_sha256", pa.string()),
+    ("submitted_by", pa.string()),
+    ("status", _CATEGORY),
+    ("rice_score", pa.float64()),
+    ("competitor_score", pa.float64()),
+    ("created_date", pa.string()),
+    ("version", pa.int64()),
+    ("dependency_start", pa.int64()),  # first row of this feature in the dependency table
+    ("dependency_count", pa.int32()),
+    ("extra", pa.string()),  # JSON of any other fields, or of values that don't fit their column
+])
+DEPENDENCY_SCHEMA = pa.schema([
+    ("row", pa.int64()),  # owning row in the feature table
+    ("team", _CATEGORY),
+    ("title", pa.string()),
+    ("description", pa.string()),
+    ("feature_id", pa.string()),
+])
+FEATURE_COLUMNS = [name for name in FEATURE_SCHEMA.names
+                   if name not in ("dependency_start", "dependency_count", "extra")]
+DEPENDENCY_FIELDS = ("team", "title", "description", "feature_id")
+_INTEGER_COLUMNS = {"year", "impact", "version"}
+_FLOAT_COLUMNS = {"rice_score", "competitor_score"}
+
+
+def _fits(column, value):
+    """Whether value can live in its typed column (anything else goes to 'extra')"""
+    if value is None:
+        return True
+    if column in _INTEGER_COLUMNS:
+        return isinstance(value, int) and not isinstance(value, bool) and -2**31 <= value < 2**31
+    if column in _FLOAT_COLUMNS:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if column == "dependent_teams":
+        return isinstance(value, list) and all(isinstance(team, str) for team in value)
+    return isinstance(value, str)
+
+
+# ======================
+# WRITING
+# ======================
+def write_snapshot(path, features, stamp):
+    """Write features as an Arrow snapshot directory: a feature table plus a dependency child table.
+
+    Both files are uncompressed Arrow IPC so they can be memory-mapped, and
+    both carry stamp (the store's write counter at the time the features
+    were read) so a reader can tell whether the snapshot is still current.
+    Files are written under temporary names and swapped in at the end.
+    """
+    os.makedirs(path, exist_ok=True)
+    columns = {name: [] for name in FEATURE_SCHEMA.names}
+    dependencies = {name: [] for name in DEPENDENCY_SCHEMA.names}
+    last_seq = 0
+    for row, feature in enumerate(features):
+        extra = {key: value for key, value in feature.items()
+                 if key not in FEATURE_SCHEMA.names and key != "dependency_details"}
+        for name in FEATURE_COLUMNS:
+            value = feature.get(name)
+            if not _fits(name, value):
+                extra[name] = value
+                value = None
+            columns[name].append(value)
+        details = feature.get("dependency_details") or []
+        columns["dependency_start"].append(len(dependencies["row"]))
+        columns["dependency_count"].append(len(details))
+        columns["extra"].append(json.dumps(extra) if extra else None)
+        for dep in details:
+            dependencies["row"].append(row)
+            for name in DEPENDENCY_FIELDS:
+                value = dep.get(name)
+                dependencies[name].append(value if isinstance(value, str) else None if value is None else str(value))
+        last_seq = max(last_seq, feature_seq(feature["id"]))
+
+    metadata = {"format": FORMAT_VERSION, "stamp": str(stamp), "last_seq": str(last_seq)}
+    _write_table(os.path.join(path, DEPENDENCIES_FILE), pa.table(dependencies, schema=DEPENDENCY_SCHEMA), metadata)
+    _write_table(os.path.join(path, FEATURES_FILE), pa.table(columns, schema=FEATURE_SCHEMA), metadata)
+
+
+def _write_table(filename, table, metadata):
+    table = table.replace_schema_metadata(metadata)
+    temporary = f"{filename}.tmp"
+    with pa.OSFile(temporary, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(temporary, filename)
+
+
+# ======================
+# READING
+# ======================
+def _open_table(filename):
+    # Zero-copy: the table's buffers point into the mapped file, so pages load on first touch
+    with pa.memory_map(filename, "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+class FeatureSnapshot:
+    """Memory-mapped, read-only view of a snapshot written by write_snapshot().
+
+    Opening it reads no rows. Columns are read on demand for bulk loaders
+    (column(), group_ids(), dependency rows), and rows() turns rows into
+    feature dicts only when something asks for them - a card, an edit
+    form, an index that needs whole features. Materialized rows are cached,
+    so every caller gets the same dict for a row, like the registry's.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.features = _open_table(os.path.join(path, FEATURES_FILE))
+        self.dependencies = _open_table(os.path.join(path, DEPENDENCIES_FILE))
+        metadata = self.features.schema.metadata or {}
+        dependency_metadata = self.dependencies.schema.metadata or {}
+        if metadata.get(b"format") != FORMAT_VERSION.encode():
+            raise ValueError(f"Unsupported snapshot format in {path}")
+        if metadata.get(b"stamp") != dependency_metadata.get(b"stamp"):
+            raise ValueError(f"Snapshot files in {path} are from different writes")
+        self.stamp = int(metadata[b"stamp"])
+        self.last_seq = int(metadata[b"last_seq"])
+        self._cache = {}  # row -> materialized feature dict
+        self._extra = None  # parsed 'extra' column, see _overrides()
+        self._ids = None
+
+    def __len__(self):
+        return self.features.num_rows
+
+    @property
+    def nbytes(self):
+        """Size of the mapped tables (mostly file pages, not process heap)"""
+        return self.features.nbytes + self.dependencies.nbytes
+
+    def ids(self):
+        """Feature ids in row order (one shared list, so indexes don't each copy the strings)"""
+        if self._ids is None:
+            self._ids = self.features.column("id").to_pylist()
+        return self._ids
+
+    def _take(self, table, rows):
+        return table if rows is None else table.take(pa.array(rows, type=pa.int64()))
+
+    # Columns (bulk loaders; rows=None means every row)
+    def _overrides(self):
+        """{field: {row: value}} from the 'extra' column: odd-typed values and fields without a column"""
+        if self._extra is None:
+            extra = self.features.column("extra")
+            overrides = {}
+            for row in pc.indices_nonzero(pc.is_valid(extra)).to_pylist():
+                for name, value in json.loads(extra[row].as_py()).items():
+                    overrides.setdefault(name, {})[row] = value
+            self._extra = overrides
+        return self._extra
+
+    def column(self, name, rows=None):
+        """Python values of one field, in row order (None where a row doesn't have it)"""
+        if name == "id":
+            ids = self.ids()
+            return ids if rows is None else [ids[row] for row in rows]
+        if name in FEATURE_SCHEMA.names:
+            values = self._take(self.features.select([name]), rows).column(0).to_pylist()
+        else:
+            values = [None] * (len(self) if rows is None else len(rows))
+        overrides = self._overrides().get(name)
+        if overrides:
+            for position, row in enumerate(range(len(self)) if rows is None else rows):
+                if row in overrides:
+                    values[position] = overrides[row]
+        return values
+
+    def array(self, name, default, mapping=None, rows=None):
+        """One field as a NumPy array: values mapped through mapping if given, missing ones as default"""
+        size = len(self) if rows is None else len(rows)
+        if name not in FEATURE_SCHEMA.names:
+            values = np.full(size, default)
+        else:
+            column = self._take(self.features.select([name]), rows).column(0).combine_chunks()
+            if mapping is not None:
+                if not isinstance(column.type, pa.DictionaryType):
+                    column = column.dictionary_encode()
+                lookup = np.array([mapping.get(value, default) for value in column.dictionary.to_pylist()] + [default])
+                values = lookup[column.indices.fill_null(-1).to_numpy(zero_copy_only=False)]
+            else:
+                values = column.fill_null(default).to_numpy(zero_copy_only=False)
+        overrides = self._overrides().get(name)
+        if overrides:
+            values = values.copy()
+            for position, row in enumerate(range(size) if rows is None else rows):
+                if row in overrides:
+                    value = overrides[row]
+                    values[position] = default if value is None else mapping.get(value, default) if mapping else value
+        return values
+
+    def group_ids(self, name, rows=None):
+        """{value: [feature ids]} for one field; rows without a value group under None"""
+        if name not in FEATURE_SCHEMA.names or self._overrides().get(name):
+            groups = {}
+            for feature_id, value in zip(self.column("id", rows), self.column(name, rows)):
+                groups.setdefault(value, []).append(feature_id)
+            return groups
+        ids = np.asarray(self.column("id", rows), dtype=object)
+        encoded = self._take(self.features.select([name]), rows).column(0).combine_chunks()
+        if not isinstance(encoded.type, pa.DictionaryType):
+            encoded = encoded.dictionary_encode()
+        codes = encoded.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+        values = encoded.dictionary.to_pylist()
+        order = np.argsort(codes, kind="stable")
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        groups = {}
+        for chunk in np.split(order, bounds):
+            if len(chunk):
+                code = codes[chunk[0]]
+                groups[None if code < 0 else values[code]] = ids[chunk].tolist()
+        return groups
+
+    def rows_with_dependencies(self, rows=None):
+        """The rows (of rows, or of all) that have at least one dependency entry"""
+        counts = self.features.column("dependency_count")
+        if rows is None:
+            return pc.indices_nonzero(pc.greater(counts, 0)).to_pylist()
+        counts = counts.to_numpy()
+        return [row for row in rows if counts[row]]
+
+    def dependency_rows(self, rows=None):
+        """The dependency child table for the given feature rows (all when rows is None)"""
+        if rows is None:
+            return self.dependencies
+        mask = pc.is_in(self.dependencies.column("row"), value_set=pa.array(rows, type=pa.int64()))
+        return self.dependencies.filter(mask)
+
+    # Rows
+    def rows(self, rows):
+        """Whole feature dicts for the given rows, materialized in batches and cached"""
+        rows = list(rows)
+        missing = sorted({row for row in rows if row not in self._cache})
+        for start in range(0, len(missing), MATERIALIZE_BATCH):
+            batch = missing[start:start + MATERIALIZE_BATCH]
+            for row, feature in zip(batch, self._materialize(batch, FEATURE_COLUMNS)):
+                self._cache.setdefault(row, feature)  # a concurrent reader may have won; everyone shares its dict
+        return [self._cache[row] for row in rows]
+
+    def records(self, fields, rows=None):
+        """Throwaway dicts holding just fields ('id' always), generated a batch at a time.
+
+        For indexes that only read a few fields of every feature and keep
+        none of the dicts; nothing is cached.
+        """
+        columns = [name for name in FEATURE_COLUMNS if name == "id" or name in fields]
+        rows = range(len(self)) if rows is None else rows
+        for start in range(0, len(rows), MATERIALIZE_BATCH):
+            yield from self._materialize(rows[start:start + MATERIALIZE_BATCH], columns,
+                                         with_dependencies="dependency_details" in fields)
+
+    def _materialize(self, rows, columns, with_dependencies=True):
+        table = self.features.take(pa.array(rows, type=pa.int64()))
+        counts = table.column("dependency_count").to_pylist()
+        extras = table.column("extra").to_pylist()
+        records = table.select(columns).to_pylist()
+
+        details = []
+        if with_dependencies:
+            starts = table.column("dependency_start").to_pylist()
+            dependency_index = [start + offset for start, count in zip(starts, counts) for offset in range(count)]
+            if dependency_index:
+                details = self.dependencies.take(pa.array(dependency_index, type=pa.int64())).select(
+                    list(DEPENDENCY_FIELDS)).to_pylist()
+
+        features = []
+        taken = 0
+        for record, count, extra in zip(records, counts, extras):
+            feature = {}
+            for name, value in record.items():
+                if value is not None:
+                    feature[name] = value
+            if with_dependencies:
+                feature["dependency_details"] = [
+                    {key: item for key, item in dep.items() if item is not None or key != "feature_id"}
+                    for dep in details[taken:taken + count]]
+                taken += count
+            if extra:
+                feature.update(json.loads(extra))
+            features.append(feature)
+        return features
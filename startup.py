@@ -0,0 +1,112 @@
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from importlib.abc import MetaPathFinder
+
+logger = logging.getLogger("aop_planner.startup")
+
+
+class _TimedLoader:
+    """Wraps a module's loader to time its first execution; everything else is delegated"""
+
+    def __init__(self, loader, report):
+        self._loader = loader
+        self._report = report
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Put the real loader back first, so the module never sees the wrapper
+        module.__loader__ = module.__spec__.loader = self._loader
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._report.record_import(module.__name__, time.perf_counter() - started)
+
+
+class _ImportTimer(MetaPathFinder):
+    """Times the first import of each top-level package (e.g. pandas), submodules included"""
+
+    def __init__(self, report):
+        self.report = report
+
+    def find_spec(self, fullname, path, target=None):
+        if "." in fullname or fullname in sys.modules:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, self.report)
+                return spec
+        return None
+
+
+class StartupReport:
+    """Wall-clock timings for one server process: named startup phases and first imports.
+
+    install() hooks the import system so every top-level package imported
+    afterwards is timed the first time it loads, including packages a page
+    imports lazily later on. Import times are inclusive (pandas includes
+    numpy if numpy was not loaded yet), so they don't add up to the total.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.imports = {}  # top-level module -> seconds
+        self.phases = {}  # phase name -> seconds
+        self.ready = None  # seconds from started to the end of the first script run
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def install(self):
+        with self._lock:
+            if self._timer is None:
+                self._timer = _ImportTimer(self)
+                sys.meta_path.insert(0, self._timer)
+
+    def record_import(self, name, seconds):
+        with self._lock:
+            self.imports.setdefault(name, seconds)
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0) + time.perf_counter() - started
+
+    def mark_ready(self):
+        """End of the first full script run; logs the report once. Later calls do nothing."""
+        with self._lock:
+            if self.ready is not None:
+                return
+            self.ready = time.perf_counter() - self.started
+        logger.info("%s", self.summary())
+
+    def summary(self, top=10):
+        """Multi-line text: time to ready, phases, and the slowest imports so far"""
+        lines = [f"Startup: ready in {self.ready:.3f}s" if self.ready is not None else "Startup: not ready yet"]
+        with self._lock:
+            phases = list(self.phases.items())
+            imports = sorted(self.imports.items(), key=lambda item: item[1], reverse=True)
+        lines.extend(f"  phase  {seconds:8.3f}s  {name}" for name, seconds in phases)
+        lines.extend(f"  import {seconds:8.3f}s  {name}" for name, seconds in imports[:top])
+        if len(imports) > top:
+            lines.append(f"  ... {len(imports) - top} more imports, "
+                         f"{sum(seconds for _, seconds in imports[top:]):.3f}s")
+        return "\n".join(lines)
+
+
+STARTUP = StartupReport()  # one per process, so reruns and new sessions add to it
@@ -0,0 +1,266 @@
+import json
+import os
+import queue
+import sqlite3
+from contextlib import contextmanager
+
+from registry import feature_seq, format_feature_id
+
+# ======================
+# SCHEMA
+# ======================
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS features (
+    id TEXT PRIMARY KEY,
+    bu TEXT,
+    status TEXT,
+    year INTEGER,
+    type TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_features_bu ON features(bu);
+CREATE INDEX IF NOT EXISTS idx_features_status ON features(status);
+CREATE INDEX IF NOT EXISTS idx_features_year ON features(year);
+CREATE INDEX IF NOT EXISTS idx_features_type ON features(type);
+
+CREATE TABLE IF NOT EXISTS vote_ledger (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    feature_id TEXT NOT NULL,
+    pm TEXT NOT NULL,
+    vote TEXT NOT NULL,
+    ts TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_vote_ledger_feature ON vote_ledger(feature_id);
+
+CREATE TABLE IF NOT EXISTS sequences (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+UPSERT_FEATURE = """
+INSERT INTO features (id, bu, status, year, type, data)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    bu = excluded.bu,
+    status = excluded.status,
+    year = excluded.year,
+    type = excluded.type,
+    data = excluded.data
+"""
+
+INSERT_VOTE = "INSERT INTO vote_ledger (feature_id, pm, vote, ts) VALUES (?, ?, ?, ?)"
+
+TOUCH_FEATURES = """
+INSERT INTO sequences (name, value) VALUES (?, 1)
+ON CONFLICT(name) DO UPDATE SET value = value + 1
+"""
+
+RAISE_SEQUENCE = """
+INSERT INTO sequences (name, value) VALUES (?, ?)
+ON CONFLICT(name) DO UPDATE SET value = MAX(value, excluded.value)
+"""
+
+FILTER_COLUMNS = ("bu", "status", "year", "type")
+FEATURE_SEQUENCE = "feature"
+FEATURE_WRITES = "feature_writes"  # bumped by every write to the features table
+
+
+def _feature_row(feature):
+    """Flatten a feature dict into its indexed columns plus the JSON payload"""
+    return (
+        feature['id'],
+        feature.get('bu'),
+        feature.get('status', 'Draft'),
+        feature.get('year'),
+        feature.get('type'),
+        json.dumps(feature),
+    )
+
+
+# ======================
+# CONNECTION POOL
+# ======================
+class ConnectionPool:
+    """Small fixed-size pool of WAL-mode SQLite connections"""
+
+    def __init__(self, path, size=4, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._pool.put(self._connect())
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success and rolls back on error"""
+        conn = self._pool.get(timeout=self.timeout)
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+# ======================
+# FEATURE STORE
+# ======================
+class FeatureStore:
+    """Durable feature/vote storage shared by every session.
+
+    With a snapshot_path, the feature table can also be kept as an Arrow
+    snapshot (see snapshot.py) that is memory-mapped at startup instead of
+    parsing every row's JSON; it is only used while no write has happened
+    since it was taken.
+    """
+
+    def __init__(self, path, pool_size=4, snapshot_path=None):
+        self.pool = ConnectionPool(path, size=pool_size)
+        self.snapshot_path = snapshot_path
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+            self._migrate_vote_counts(conn)
+
+    def _migrate_vote_counts(self, conn):
+        """Turn the old anonymous per-feature counters into unattributed ledger entries"""
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'votes'").fetchone():
+            return
+        entries = []
+        for feature_id, approve, reject in conn.execute("SELECT feature_id, approve, reject FROM votes"):
+            votes = ['approve'] * approve + ['reject'] * reject
+            entries += [(feature_id, f"Unattributed vote {i + 1}", vote, "") for i, vote in enumerate(votes)]
+        conn.executemany(INSERT_VOTE, entries)
+        conn.execute("DROP TABLE votes")
+
+    # Features
+    def load_features(self):
+        """Return all features in insertion order"""
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT data FROM features ORDER BY rowid").fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def get_feature(self, feature_id):
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT data FROM features WHERE id = ?", (feature_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query_features(self, **filters):
+        """Return features matching exact values on the indexed columns (bu, status, year, type)"""
+        clauses = []
+        params = []
+        for column, value in filters.items():
+            if column not in FILTER_COLUMNS:
+                raise ValueError(f"Cannot filter on '{column}'")
+            clauses.append(f"{column} = ?")
+            params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.pool.connection() as conn:
+            rows = conn.execute(f"SELECT data FROM features{where} ORDER BY rowid", params).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def save_feature(self, feature):
+        self.save_features([feature])
+
+    def save_features(self, features):
+        """Insert or update several features in one transaction"""
+        with self.pool.connection() as conn:
+            conn.executemany(UPSERT_FEATURE, [_feature_row(f) for f in features])
+            conn.execute(TOUCH_FEATURES, (FEATURE_WRITES,))
+
+    def delete_feature(self, feature_id):
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM features WHERE id = ?", (feature_id,))
+            conn.execute(TOUCH_FEATURES, (FEATURE_WRITES,))
+            conn.execute("DELETE FROM vote_ledger WHERE feature_id = ?", (feature_id,))
+
+    def replace_all(self, features, clear_votes=False):
+        """Swap the whole portfolio atomically.
+
+        The vote history is kept unless clear_votes, and the id sequence
+        never moves back, so old votes can't attach to a reused id.
+        """
+        last_seq = max((feature_seq(f['id']) for f in features), default=0)
+        with self.pool.connection() as conn:
+            if clear_votes:
+                conn.execute("DELETE FROM vote_ledger")
+            conn.execute("DELETE FROM features")
+            conn.executemany(UPSERT_FEATURE, [_feature_row(f) for f in features])
+            conn.execute(RAISE_SEQUENCE, (FEATURE_SEQUENCE, last_seq))
+            conn.execute(TOUCH_FEATURES, (FEATURE_WRITES,))
+
+    def clear(self, clear_votes=False):
+        self.replace_all([], clear_votes)
+
+    def allocate_feature_id(self):
+        """Atomically take the next feature id; ids are never reused, even across sessions"""
+        return self.allocate_feature_ids(1)[0]
+
+    def allocate_feature_ids(self, count):
+        """Atomically reserve count consecutive feature ids (e.g. for a bulk import)"""
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT value FROM sequences WHERE name = ?", (FEATURE_SEQUENCE,)).fetchone()
+            if row is None:
+                ids = conn.execute("SELECT id FROM features").fetchall()
+                last_seq = max((feature_seq(feature_id) for (feature_id,) in ids), default=0)
+            else:
+                last_seq = row[0]
+            conn.execute("INSERT OR REPLACE INTO sequences (name, value) VALUES (?, ?)",
+                         (FEATURE_SEQUENCE, last_seq + count))
+        return [format_feature_id(seq) for seq in range(last_seq + 1, last_seq + count + 1)]
+
+    # Votes
+    def load_vote_ledger(self):
+        """Every vote ever cast, oldest first, as (feature_id, pm, vote, ts)"""
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT feature_id, pm, vote, ts FROM vote_ledger ORDER BY seq").fetchall()
+
+    def append_vote(self, entry, feature=None):
+        """Append one ledger entry, and the feature's updated status if given, atomically"""
+        with self.pool.connection() as conn:
+            conn.execute(INSERT_VOTE, tuple(entry))
+            if feature is not None:
+                conn.execute(UPSERT_FEATURE, _feature_row(feature))
+                conn.execute(TOUCH_FEATURES, (FEATURE_WRITES,))
+
+    # Snapshots
+    def feature_stamp(self):
+        """Count of feature writes so far; a snapshot taken at this stamp is current until it moves"""
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT value FROM sequences WHERE name = ?", (FEATURE_WRITES,)).fetchone()
+        return row[0] if row else 0
+
+    def load_snapshot(self, stamp):
+        """The memory-mapped snapshot if it was taken at stamp, else None (also without pyarrow)"""
+        if not self.snapshot_path or not os.path.isdir(self.snapshot_path):
+            return None
+        try:
+            from snapshot import FeatureSnapshot  # optional; needs pyarrow
+            snapshot = FeatureSnapshot(self.snapshot_path)
+        except (ImportError, OSError, ValueError, KeyError):
+            return None  # missing, half-written or from another format: fall back to SQLite
+        return snapshot if snapshot.stamp == stamp else None
+
+    def save_snapshot(self, features, stamp):
+        """Write features, read at stamp, as the snapshot; False when snapshots are off or unavailable"""
+        if not self.snapshot_path:
+            return False
+        try:
+            from snapshot import write_snapshot  # optional; needs pyarrow
+        except ImportError:
+            return False
+        if stamp != self.feature_stamp():
+            return False  # written to meanwhile: it would be stale on arrival and could replace a newer one
+        write_snapshot(self.snapshot_path, features, stamp)
+        return True
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared import SharedPortfolio  # noqa: E402
+from storage import FeatureStore  # noqa: E402
+
+
+def make_feature(title="Feature", bu="AI BU", **fields):
+    feature = {"title": title, "description": f"{title} description", "bu": bu, "year": 2026, "half": "H1",
+               "quarter": "Q1", "type": "Big Rock", "impact": 5, "effort": "M", "status": "Submitted",
+               "dependency_details": [], "dependent_teams": [], "created_date": "2026-01-01 00:00:00"}
+    feature.update(fields)
+    return feature
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: timing test, run only when AOP_BENCHMARK is set")
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get("AOP_BENCHMARK"):
+        return
+    skip = pytest.mark.skip(reason="timing test; set AOP_BENCHMARK=1 to run it")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FeatureStore(str(tmp_path / "aop.db"))
+    yield store
+    store.pool.close()
+
+
+@pytest.fixture
+def portfolio(store):
+    return SharedPortfolio(store)
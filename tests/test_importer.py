@@ -0,0 +1,54 @@
+import io
+import json
+
+import pytest
+
+from conftest import make_feature
+from exporter import export_features
+from importer import RowError, RowValidator, import_features
+
+BUSINESS_UNITS = ["AI BU", "CX BU"]
+
+
+def row(dependencies):
+    return {"title": "New", "description": "d", "bu": "AI BU", "year": "2027", "quarter": "Q1",
+            "type": "Big Rock", "dependencies": dependencies}
+
+
+@pytest.fixture
+def validator(portfolio):
+    portfolio.add_features([make_feature("Blocker", bu="CX BU")])
+    return RowValidator(BUSINESS_UNITS, ["Big Rock"], ["Draft"], years=[2027], features=portfolio.features)
+
+
+def test_dependency_keeps_a_valid_blocker(validator):
+    feature = validator.validate(row([{"team": "CX BU", "title": "API", "feature_id": "f-0001"}]))
+    assert feature["dependency_details"] == [{"team": "CX BU", "title": "API", "description": "",
+                                              "feature_id": "F-0001"}]
+
+
+@pytest.mark.parametrize("feature_id, message", [
+    ("F-0099", "no feature F-0099"),
+    ("nope", "'NOPE' is not a feature id"),
+])
+def test_dependency_rejects_unknown_blockers(validator, feature_id, message):
+    with pytest.raises(RowError, match=message):
+        validator.validate(row(json.dumps([{"team": "CX BU", "feature_id": feature_id}])))
+
+
+def test_dependency_rejects_a_blocker_of_another_team(validator):
+    with pytest.raises(RowError, match="F-0001 belongs to CX BU, not AI BU"):
+        validator.validate(row([{"team": "AI BU", "feature_id": "F-0001"}]))
+
+
+def test_exported_blockers_survive_reimport(portfolio, validator):
+    blocked = make_feature("Blocked", year=2027, type="Big Rock", status="Draft",
+                           dependency_details=[{"team": "CX BU", "title": "API", "description": "",
+                                                "feature_id": "F-0001"}])
+    portfolio.add_features([blocked])
+    with export_features(list(portfolio.features), {}, "csv") as export:
+        data = io.BytesIO(export.read())
+    imported = []
+    report = import_features(data, "export.csv", validator, imported.extend)
+    assert report.failed == 1  # the blocker itself: its year and status are outside what the validator accepts
+    assert imported[0]["dependency_details"][0]["feature_id"] == "F-0001"
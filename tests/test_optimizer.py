@@ -0,0 +1,70 @@
+import itertools
+import random
+
+import pytest
+
+from optimizer import plan_portfolio, select_features
+from scoring import EFFORT_POINTS
+
+
+def random_features(count, rng):
+    return [{"id": f"F-{number:04d}", "bu": rng.choice(["AI BU", "CX BU"]), "year": 2026,
+             "quarter": rng.choice(["Q1", "Q2"]), "effort": rng.choice(list(EFFORT_POINTS)),
+             "rice_score": rng.choice([0, round(rng.uniform(1, 100), 2)]),
+             "status": rng.choice(["Draft", "Approved", "Rejected"])}
+            for number in range(1, count + 1)]
+
+
+def brute_force(features, capacity):
+    """Best total RICE over every subset that fits"""
+    best = 0
+    for size in range(len(features) + 1):
+        for subset in itertools.combinations(features, size):
+            if sum(EFFORT_POINTS[feature["effort"]] for feature in subset) <= capacity:
+                best = max(best, sum(feature["rice_score"] for feature in subset))
+    return round(best, 2)
+
+
+def assert_fits(selection, features, capacity):
+    by_id = {feature["id"]: feature for feature in features}
+    chosen = [by_id[feature_id] for feature_id in selection.selected]
+    assert len(set(selection.selected)) == len(chosen)
+    assert selection.effort == sum(EFFORT_POINTS[feature["effort"]] for feature in chosen) <= capacity
+    assert selection.value == pytest.approx(sum(feature["rice_score"] for feature in chosen), abs=0.01)
+    assert all(feature["rice_score"] > 0 for feature in chosen)
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_dp_matches_brute_force(seed):
+    rng = random.Random(seed)
+    features = random_features(rng.randint(0, 12), rng)
+    capacity = rng.randint(0, 25)
+    selection = select_features(features, capacity)
+    assert selection.method == "optimal"
+    assert_fits(selection, features, capacity)
+    assert selection.value == pytest.approx(brute_force(features, capacity), abs=0.01)
+    assert selection.gap == 0
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_greedy_fallback_stays_within_its_bound(seed):
+    rng = random.Random(seed)
+    features = random_features(rng.randint(1, 12), rng)
+    capacity = rng.randint(0, 25)
+    selection = select_features(features, capacity, max_cells=0)
+    assert_fits(selection, features, capacity)
+    optimum = brute_force(features, capacity)
+    # Greedy plus the best single item is at least half the optimum, and the LP bound is never below it
+    assert optimum / 2 - 0.01 <= selection.value <= optimum + 0.01
+    assert selection.bound >= optimum - 0.01
+
+
+def test_plan_buckets_by_bu_and_quarter_and_skips_rejected():
+    features = random_features(40, random.Random(7))
+    plan = plan_portfolio(features, capacity={"AI BU": 6}, default_capacity=9)
+    for (bu, year, quarter), selection in plan.items():
+        bucket = [feature for feature in features if (feature["bu"], feature["year"], feature["quarter"])
+                  == (bu, year, quarter) and feature["status"] != "Rejected"]
+        capacity = 6 if bu == "AI BU" else 9
+        assert_fits(selection, bucket, capacity)
+        assert selection.value == pytest.approx(brute_force(bucket, capacity), abs=0.01)
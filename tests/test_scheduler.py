@@ -0,0 +1,105 @@
+import random
+from collections import Counter
+
+import pytest
+
+from links import FeatureLinks
+from registry import FeatureRegistry
+from scheduler import QuarterScheduler, feature_demand, from_slot, to_slot
+
+TEAMS = ["AI BU", "CX BU", "EX BU", "CE BU", "Platform BU"]
+
+
+def random_features(count, rng):
+    features = []
+    for number in range(1, count + 1):
+        dependencies = []
+        for _ in range(rng.randint(0, 2)):
+            dependency = {"team": rng.choice(TEAMS), "title": "ask", "description": ""}
+            if number > 1 and rng.random() < 0.3:
+                dependency["feature_id"] = f"F-{rng.randint(1, number - 1):04d}"
+            dependencies.append(dependency)
+        features.append({"id": f"F-{number:04d}", "title": "x", "bu": rng.choice(TEAMS),
+                         "year": rng.choice([2025, 2026]), "quarter": rng.choice(["Q1", "Q2", "Q3", "Q4"]),
+                         "effort": rng.choice(["XS", "S", "M", "L", "XL"]), "rice_score": rng.uniform(0, 100),
+                         "status": "Draft", "dependency_details": dependencies})
+    return features
+
+
+def build(features, default_capacity):
+    registry = FeatureRegistry(features)
+    links = registry.attach(FeatureLinks())
+    scheduler = registry.attach(QuarterScheduler(links, default_capacity=default_capacity))
+    return registry, links, scheduler
+
+
+def assert_valid(registry, links, scheduler, capacity=None):
+    """Capacity, blocker order and 'never before the entered year' hold; load matches placements"""
+    assignments = scheduler.assignments(capacity)
+    load = Counter()
+    for feature_id, proposed in assignments.items():
+        if proposed is None:
+            continue
+        feature = registry.get(feature_id)
+        slot = to_slot(*proposed)
+        assert slot >= to_slot(feature['year'], "Q1")
+        for blocker in links.blockers(feature_id):
+            if blocker in assignments:
+                assert assignments[blocker] is not None and to_slot(*assignments[blocker]) < slot
+        for team, points in feature_demand(feature).items():
+            load[(team, slot)] += points
+    for (team, slot), points in load.items():
+        assert points <= scheduler.team_capacity(team, capacity)
+        assert scheduler.load(team, *from_slot(slot), capacity=capacity) == points
+
+
+def random_edits(registry, rng, count):
+    for _ in range(count):
+        feature_id = f"F-{rng.randint(1, len(registry) + 10):04d}"
+        if feature_id not in registry:
+            continue
+        if rng.random() < 0.1:
+            registry.remove(feature_id)
+        else:
+            registry.update(dict(registry.get(feature_id), quarter=rng.choice(["Q1", "Q4"]),
+                                 effort=rng.choice(["XS", "XL"])))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_and_replan_keep_invariants(seed):
+    rng = random.Random(seed)
+    registry, links, scheduler = build(random_features(60, rng), default_capacity=15)
+    assert_valid(registry, links, scheduler)
+    for _ in range(10):
+        random_edits(registry, rng, 5)
+        assert_valid(registry, links, scheduler)
+
+    # From scratch: same answer as a scheduler that never saw the edits
+    replanned = scheduler.replan()
+    assert_valid(registry, links, scheduler)
+    _, _, fresh = build([dict(feature) for feature in registry], default_capacity=15)
+    assert replanned == fresh.assignments()
+
+
+def test_plan_version_moves_on_edits_and_replan():
+    registry, links, scheduler = build(random_features(20, random.Random(1)), default_capacity=15)
+    first = scheduler.plan_version()
+    assert scheduler.plan_version() == first  # nothing changed
+    registry.update(dict(registry.get("F-0003"), quarter="Q4"))
+    second = scheduler.plan_version()
+    assert second != first
+    scheduler.replan()
+    assert scheduler.plan_version() not in (first, second)
+
+
+def test_capacities_are_per_caller():
+    registry, links, scheduler = build(random_features(40, random.Random(2)), default_capacity=15)
+    tight = dict.fromkeys(TEAMS, 3)
+    loose = dict.fromkeys(TEAMS, 100)
+    tight_plan = scheduler.assignments(tight)
+    loose_plan = scheduler.assignments(loose)
+    # Asking with other capacities doesn't change either plan
+    assert scheduler.assignments(tight) == tight_plan
+    assert all(proposed is not None for proposed in loose_plan.values())
+    assert_valid(registry, links, scheduler, tight)
+    assert_valid(registry, links, scheduler, loose)
@@ -0,0 +1,116 @@
+import random
+import time
+
+import pytest
+
+from search import SearchIndex, passage_terms
+
+COMMON = "platform data real time model pipeline dashboard metrics segmentation churn api latency".split()
+PREFIXED = "customer customers custom customize customization customizable custody customs".split()
+
+
+def random_features(count, seed, vocabulary=1000):
+    """Half common words, a few sharing the prefix 'cust', the rest from a long tail"""
+    rng = random.Random(seed)
+    rare = [f"w{n}" for n in range(vocabulary)]
+
+    def word():
+        draw = rng.random()
+        return rng.choice(COMMON) if draw < 0.5 else rng.choice(PREFIXED) if draw < 0.55 else rng.choice(rare)
+
+    return [{"id": f"F-{n:06d}", "title": " ".join(word() for _ in range(4)),
+             "description": " ".join(word() for _ in range(rng.randint(5, 25)))} for n in range(count)]
+
+
+def assert_same_results(actual, expected):
+    assert [feature_id for feature_id, _ in actual] == [feature_id for feature_id, _ in expected]
+    assert [score for _, score in actual] == pytest.approx([score for _, score in expected])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_grouped_postings_score_like_plain_ones(seed):
+    features = random_features(400, seed)
+    grouped, plain = SearchIndex(group_min_df=4), SearchIndex(group_min_df=10 ** 9)
+    for index in (grouped, plain):
+        for feature in features:
+            index.add(feature)
+        # Removing most of them takes common terms back below the threshold
+        for feature in features[:350]:
+            index.remove(feature)
+        for feature in features[:40]:
+            index.add(dict(feature, description=feature["description"] + " customer"))
+    assert grouped._groups and plain._groups == {}
+    for query in ("cust", "customer", "custom dashboard", "w1", "data w12 latency", "nothing"):
+        # Ties come back in either order; the sort makes the comparison about the scores
+        assert_same_results(sorted(grouped.search(query), key=lambda item: (-item[1], item[0])),
+                            sorted(plain.search(query), key=lambda item: (-item[1], item[0])))
+
+
+def test_expansions_keep_the_most_frequent_and_the_word_as_typed():
+    index = SearchIndex(max_expansions=2)
+    index.add({"id": "F-1", "title": "cust", "description": ""})
+    for n in range(3):
+        index.add({"id": f"F-{n + 2}", "title": "customer", "description": "customers" * (n > 0)})
+    index.add({"id": "F-9", "title": "custody", "description": ""})
+    assert sorted(index._expand("cust")) == ["cust", "customer"]
+    assert sorted(index._expand("custo")) == ["customer", "customers"]
+
+
+def test_passages_count_for_features_pointing_at_the_file():
+    index = SearchIndex()
+    index.add({"id": "F-1", "title": "Churn", "description": "", "prd_sha256": "ab"})
+    index.add_passages("ab", passage_terms(["retention cohorts", "pricing experiments"]))
+    index.add({"id": "F-2", "title": "Other", "description": "", "prd_sha256": "ab"})
+    assert sorted(feature_id for feature_id, _ in index.search("cohorts")) == ["F-1", "F-2"]
+    index.remove({"id": "F-1", "prd_sha256": "ab"})
+    assert [feature_id for feature_id, _ in index.search("pricing")] == ["F-2"]
+
+
+def test_warm_loads_backlog_without_losing_edits():
+    pytest.importorskip("pyarrow")
+    import tempfile
+    import threading
+
+    from snapshot import FeatureSnapshot, write_snapshot
+
+    features = random_features(1200, seed=0)
+    with tempfile.TemporaryDirectory() as root:
+        write_snapshot(root, features, stamp=0)
+        snapshot = FeatureSnapshot(root)
+        index = SearchIndex()
+        index.load_rows(snapshot, None)
+        # Edited and deleted while the backlog is still pending: the snapshot row must not come back
+        index.add(dict(features[0], title="zebra"))
+        index.remove(features[1])
+        index.warm(threading.Lock(), batch=100)
+        assert index._backlog is None
+        assert len(index) == 1199
+        assert index.search("zebra")[0][0] == "F-000000"
+        assert "F-000001" not in dict(index.search(features[1]["title"]))
+
+
+def test_prefix_search_finds_every_feature_with_a_matching_word():
+    features = random_features(2000, seed=1)
+    index = SearchIndex()
+    for feature in features:
+        index.add(feature)
+    results = index.search("cust")
+    expected = {feature["id"] for feature in features
+                if any(word.startswith("cust") for word in (feature["title"] + " " + feature["description"]).split())}
+    assert {feature_id for feature_id, _ in results} == expected
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+
+
+@pytest.mark.benchmark
+def test_prefix_search_latency_budget():
+    index = SearchIndex()
+    for feature in random_features(100_000, seed=1, vocabulary=20_000):
+        index.add(feature)
+    best = min(timed(index.search, "cust") for _ in range(5))
+    assert best < 0.05, f"'cust' over 100k features took {best * 1000:.0f}ms"
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+
+from conftest import make_feature
+from shared import ConflictError, SharedPortfolio
+
+
+def test_votes_from_stale_boards_all_count(portfolio):
+    """A vote that moves the status must not make the next PM's vote a conflict"""
+    feature = portfolio.save_feature(make_feature())
+    board = dict(feature)  # every PM's board was loaded at this version
+
+    for pm in ("AI BU PM Head", "CX BU PM Head", "EX BU PM Head"):
+        portfolio.vote(board['id'], pm, "approve")
+    assert portfolio.features.get(board['id'])['version'] > board['version']  # the status moved meanwhile
+
+    assert portfolio.votes.tally(feature['id']) == {"approve": 3, "reject": 0}
+    assert portfolio.features.get(feature['id'])['status'] == "Approved"
+
+
+def test_concurrent_votes_on_one_feature(portfolio):
+    feature = portfolio.save_feature(make_feature())
+    pms = [f"PM {n}" for n in range(8)]
+    errors = []
+
+    def vote(pm):
+        try:
+            portfolio.vote(feature['id'], pm, "approve" if pm != "PM 0" else "reject")
+        except Exception as error:  # collected, so a failure shows up in the assert
+            errors.append(error)
+
+    threads = [threading.Thread(target=vote, args=(pm,)) for pm in pms]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert portfolio.votes.tally(feature['id']) == {"approve": 7, "reject": 1}
+    assert portfolio.features.get(feature['id'])['status'] == "Approved"
+    # Durable: a fresh portfolio replays the same ledger
+    assert SharedPortfolio(portfolio.store).votes.tally(feature['id']) == {"approve": 7, "reject": 1}
+
+
+def test_vote_on_deleted_feature_conflicts(portfolio):
+    feature = portfolio.save_feature(make_feature())
+    portfolio.delete_feature(feature['id'])
+    with pytest.raises(ConflictError):
+        portfolio.vote(feature['id'], "AI BU PM Head", "approve")
+
+
+def test_stale_edit_still_conflicts(portfolio):
+    feature = portfolio.save_feature(make_feature())
+    loaded = dict(feature)
+    portfolio.save_feature(dict(loaded, title="Theirs"), loaded['version'])
+    with pytest.raises(ConflictError):
+        portfolio.save_feature(dict(loaded, title="Mine"), loaded['version'])
+
+
+def test_allocated_ids_are_unique_across_threads(store):
+    ids = []
+    lock = threading.Lock()
+
+    def allocate():
+        batch = store.allocate_feature_ids(25)
+        with lock:
+            ids.extend(batch)
+
+    threads = [threading.Thread(target=allocate) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(ids) == len(set(ids)) == 200
+
+
+def test_record_locks_stay_bounded(portfolio):
+    for feature in portfolio.add_features([make_feature(f"F{n}") for n in range(200)]):
+        portfolio.delete_feature(feature['id'])
+    assert portfolio.record_lock("F-0001") is portfolio.record_lock("F-0001")
+    assert len({id(portfolio.record_lock(f"F-{n:04d}")) for n in range(1000)}) <= 64
+
+
+def test_reset_keeps_vote_history_and_never_reuses_ids(portfolio, store):
+    first = portfolio.add_features([make_feature("A"), make_feature("B")])
+    portfolio.vote(first[0]['id'], "AI BU PM Head", "approve")
+
+    portfolio.replace_all([])
+    assert len(store.load_vote_ledger()) == 1
+    again = portfolio.add_features([make_feature("C")])
+    assert again[0]['id'] not in {feature['id'] for feature in first}
+
+    portfolio.replace_all([], clear_votes=True)
+    assert store.load_vote_ledger() == [] and not portfolio.votes
+
+
+def test_patch_keeps_edits_and_deletes_made_during_its_write(portfolio, store, monkeypatch):
+    first, second = portfolio.add_features([make_feature("A"), make_feature("B")])
+    writing, release = threading.Event(), threading.Event()
+    save_features = store.save_features
+
+    def paused(features):
+        writing.set()
+        release.wait(5)
+        save_features(features)
+
+    monkeypatch.setattr(store, "save_features", paused)
+    patch = threading.Thread(target=portfolio.patch_features,
+                             args=({first['id']: {'rice_score': 1.0}, second['id']: {'rice_score': 2.0}},))
+    patch.start()
+    assert writing.wait(5)
+    monkeypatch.setattr(store, "save_features", save_features)
+    edit = threading.Thread(target=portfolio.save_feature, args=(dict(first, title="Edited"),))
+    delete = threading.Thread(target=portfolio.delete_feature, args=(second['id'],))
+    edit.start()
+    delete.start()
+    edit.join(0.2)
+    assert edit.is_alive() and delete.is_alive()  # waiting for the patch's record locks
+
+    release.set()
+    for thread in (patch, edit, delete):
+        thread.join(5)
+    stored = store.load_features()
+    assert [(feature['id'], feature['title'], feature['rice_score']) for feature in stored] == \
+        [(first['id'], "Edited", 1.0)]
@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from conftest import make_feature  # noqa: E402
+from registry import FeatureRegistry  # noqa: E402
+from shared import SharedPortfolio  # noqa: E402
+from snapshot import FeatureSnapshot, write_snapshot  # noqa: E402
+from storage import FeatureStore  # noqa: E402
+
+
+def sample_features():
+    return [
+        make_feature("Plain", id="F-0001", created_date="2026-01-03 00:00:00", version=1),
+        make_feature("Linked", id="F-0002", created_date="2026-01-01 00:00:00", version=4, bu="CX BU",
+                     dependency_details=[{"team": "EX BU", "title": "API", "description": "needs it",
+                                          "feature_id": "F-0001"},
+                                         {"team": "AI BU", "title": "", "description": ""}],
+                     dependent_teams=["EX BU", "AI BU"], prd_file="spec.txt", prd_sha256="ab" * 32),
+        # Odd values that don't fit their column, and a field without one
+        make_feature("Odd", id="F-0007", created_date="2026-01-02 00:00:00", version=1, year="2027",
+                     impact=7.5, custom={"k": [1, 2]}),
+    ]
+
+
+def test_round_trip(tmp_path):
+    features = sample_features()
+    write_snapshot(str(tmp_path), features, stamp=5)
+    snapshot = FeatureSnapshot(str(tmp_path))
+    assert snapshot.stamp == 5 and snapshot.last_seq == 7
+    assert snapshot.ids() == ["F-0001", "F-0002", "F-0007"]
+    assert snapshot.rows(range(3)) == features
+
+
+def test_registry_reads_lazily_and_matches(tmp_path):
+    features = sample_features()
+    write_snapshot(str(tmp_path), features, stamp=0)
+    registry = FeatureRegistry(snapshot=FeatureSnapshot(str(tmp_path)))
+    assert registry._unread == 3
+    assert [feature['id'] for feature in registry.newest(2)] == ["F-0001", "F-0007"]
+    assert registry._unread == 1  # only the two shown were read
+    assert list(registry) == features
+
+
+def test_store_uses_snapshot_only_while_current(tmp_path):
+    store = FeatureStore(str(tmp_path / "aop.db"), snapshot_path=str(tmp_path / "snapshot"))
+    portfolio = SharedPortfolio(store)
+    portfolio.add_features([make_feature("A"), make_feature("B")])
+    stamp = store.feature_stamp()
+    store.save_snapshot(list(portfolio.features), stamp)
+
+    assert store.load_snapshot(stamp) is not None
+    restarted = SharedPortfolio(store)
+    assert restarted.features._unread == 2
+    assert restarted.search_index.search("A")[0][0] == "F-0001"
+
+    portfolio.save_feature(make_feature("C"))
+    assert store.load_snapshot(store.feature_stamp()) is None